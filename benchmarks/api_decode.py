@@ -0,0 +1,86 @@
+"""Micro-benchmarks for decoding OKX Racer responses and parsing Telegram init data.
+
+Run from the repository root:
+
+    python -m benchmarks.api_decode [--accounts 10000]
+"""
+import argparse
+import json
+import timeit
+from urllib.parse import quote, unquote
+
+from bot.core import api
+from bot.core.api import InitData, RacerInfo, Task, Boost, AssessResult
+
+USER = '{"id":123456789,"first_name":"John","last_name":"Doe","username":"johndoe","language_code":"en",' \
+       '"allows_write_to_pm":true}'
+TG_WEB_DATA = f'query_id=AAHdF6IQAAAAAN0XohDhrOrc&user={quote(USER)}&auth_date=1716922846' \
+              f'&hash=c501b71e775f74ce10e377dea85a7ea24ecd640b223ea86dfe453e0eaed2e2b2'
+AUTH_URL = f'https://www.okx.com/#tgWebAppData={quote(TG_WEB_DATA)}&tgWebAppVersion=7.4&tgWebAppPlatform=android'
+
+RESPONSES = {
+    'info': (RacerInfo, lambda payload: payload['data'], json.dumps({"code": 0, "data": {
+        "balancePoints": 123456, "numChances": 7, "secondToRefresh": 1800, "curCombo": 3, "speed": 1,
+        "fuelTank": {"max": 7}, "turboCharger": {"stage": 2}}, "msg": ""}).encode()),
+    'tasks': (Task, lambda payload: payload['data'], json.dumps({"code": 0, "data": [
+        {"id": i, "state": i % 2, "points": 1000, "context": {"name": f"Task {i}", "link": "https://t.me/okx"}}
+        for i in range(1, 16)], "msg": ""}).encode()),
+    'boosts': (Boost, lambda payload: payload['data'], json.dumps({"code": 0, "data": [
+        {"id": i, "pointCost": 2000 * i, "curStage": 1, "totalStage": 5, "context": {"name": name}}
+        for i, name in enumerate(('Reload Fuel Tank', 'Fuel Tank', 'Turbo Charger'), start=1)], "msg": ""}).encode()),
+    'assess': (AssessResult, lambda payload: payload['data'], json.dumps({"code": 0, "data": {
+        "won": True, "basePoint": 50, "multiplier": 2, "balancePoints": 123556, "numChance": 6, "curCombo": 4,
+        "prevPrice": 60000.1, "currentPrice": 60001.2}, "msg": ""}).encode()),
+}
+
+# Requests per account per hour with the default settings (one info + boosts per round, ~7 assess per round)
+CALLS_PER_HOUR = {'info': 8, 'tasks': 1, 'boosts': 8, 'assess': 50}
+
+
+def parse_init_data_split(auth_url: str) -> str:
+    tg_web_data = unquote(string=unquote(string=auth_url.split('tgWebAppData=')[1].split('&tgWebAppVersion')[0]))
+    query_id = tg_web_data.split('query_id=')[1].split('&user=')[0]
+    user = quote(tg_web_data.split("&user=")[1].split('&auth_date=')[0])
+    auth_date = tg_web_data.split('&auth_date=')[1].split('&hash=')[0]
+    hash_ = tg_web_data.split('&hash=')[1]
+    tg_web_data.split('"id":')[1].split(',"first_name"')[0]
+    tg_web_data.split('"first_name":"')[1].split('","last_name"')[0]
+    tg_web_data.split('"last_name":"')[1].split('","username"')[0]
+    return f"query_id={query_id}&user={user}&auth_date={auth_date}&hash={hash_}"
+
+
+def measure(func, number: int) -> float:
+    """Returns the best time per call in microseconds."""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--accounts", type=int, default=10000, help="Fleet size used for the hourly projection")
+    parser.add_argument("--number", type=int, default=20000, help="Iterations per measurement")
+    args = parser.parse_args()
+
+    assert InitData.from_url(AUTH_URL).to_query() == parse_init_data_split(AUTH_URL)
+
+    print(f"JSON decoder: {api.loads.__module__}.{api.loads.__name__}")
+    print(f"{'endpoint':<10}{'json.loads':>14}{'api.loads':>14}{'+model':>14}{'fleet CPU s/h':>16}")
+    for name, (model, extract, body) in RESPONSES.items():
+        stdlib = measure(lambda: json.loads(body), args.number)
+        fast = measure(lambda: api.loads(body), args.number)
+
+        def decode():
+            data = extract(api.loads(body))
+            return [model(item) for item in data] if isinstance(data, list) else model(data)
+
+        full = measure(decode, args.number)
+        fleet = full * CALLS_PER_HOUR[name] * args.accounts / 1e6
+        print(f"{name:<10}{stdlib:>12.2f}us{fast:>12.2f}us{full:>12.2f}us{fleet:>16.3f}")
+
+    split = measure(lambda: parse_init_data_split(AUTH_URL), args.number)
+    parsed = measure(lambda: InitData.from_url(AUTH_URL).to_query(), args.number)
+    print(f"init data: str.split {split:.2f}us | InitData.from_url {parsed:.2f}us "
+          f"(parsed once per account per hour)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Offline backtest of the prediction strategies.
+
+Replays BTC-USDT ticks through every strategy in `bot.core.strategies`. A play is made every `--interval`
+seconds and settled `--horizon` seconds later; ties count as lost. Reports the win rate and the
+distribution of win streaks, which is what MAX_COMBO_COUNT cuts off. Run from the repository root:
+
+    python -m benchmarks.backtest --synthetic 2000000
+    python -m benchmarks.backtest --ticks data/ticks --window 3 5 10
+"""
+import argparse
+import os
+from time import perf_counter
+
+os.environ.setdefault('API_ID', '1')
+os.environ.setdefault('API_HASH', 'backtest')
+
+import numpy as np
+
+from bot.config import settings
+from bot.core.strategies import STRATEGIES, UP, resample
+from bot.core.ticks import TickReader
+
+
+def synthetic_ticks(seconds: int, phi: float, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    """Random walk with AR(1) returns at one tick per second, `phi` > 0 makes moves persist."""
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0, 5, seconds)
+    if phi:
+        # The AR(1) impulse response phi ** k is truncated once it drops below 1e-9
+        kernel = phi ** np.arange(int(np.log(1e-9) / np.log(abs(phi))) + 1)
+        returns = np.convolve(returns, kernel)[:seconds]
+    ts = 1.7e9 + np.arange(seconds, dtype=np.float64)
+    return ts, np.round(60000 + np.cumsum(returns), 1)
+
+
+def streaks(wins: np.ndarray) -> np.ndarray:
+    """Returns the lengths of all runs of consecutive wins."""
+    edges = np.diff(np.concatenate(([0], wins.astype(np.int8), [0])))
+    return np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+
+
+def evaluate(prices: np.ndarray, signals: np.ndarray, horizon: int, interval: int, start: int) -> np.ndarray:
+    plays = np.arange(start, len(prices) - horizon, interval)
+    moves = prices[plays + horizon] - prices[plays]
+    return np.where(signals[plays] == UP, moves > 0, moves < 0)
+
+
+def report(name: str, wins: np.ndarray, max_combo: int) -> None:
+    lengths = streaks(wins=wins)
+    capped = np.minimum(lengths, max_combo)
+    histogram = np.bincount(capped, minlength=max_combo + 1)[1:]
+    shown = ", ".join(f"{length}: {count}" for length, count in enumerate(histogram[:5], start=1))
+    print(f"{name:<22} win rate {wins.mean() * 100:5.2f}% | plays {len(wins)} | "
+          f"mean streak {lengths.mean() if len(lengths) else 0:.2f} | longest {lengths.max(initial=0)} | "
+          f"streaks {shown}, ... {max_combo}+: {histogram[-1]}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--ticks", help="TICK_RECORDER directory or a .npy array of shape (N, 2) with timestamp "
+                                        "and price columns")
+    source.add_argument("--synthetic", type=int, help="Generate this many seconds of synthetic ticks")
+    parser.add_argument("--start", type=float, help="First unix timestamp to replay from a TICK_RECORDER directory")
+    parser.add_argument("--end", type=float, help="Unix timestamp to stop replaying at")
+    parser.add_argument("--phi", type=float, default=0.0, help="Return autocorrelation of the synthetic ticks")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--window", type=int, nargs='+', default=[settings.PREDICTION_WINDOW])
+    parser.add_argument("--horizon", type=int, default=5, help="Seconds between a play and its settlement")
+    parser.add_argument("--interval", type=int, default=8, help="Seconds between two plays")
+    parser.add_argument("--max-combo", type=int, default=settings.MAX_COMBO_COUNT)
+    args = parser.parse_args()
+
+    started = perf_counter()
+    if args.ticks and os.path.isdir(args.ticks):
+        ticks = TickReader(directory=args.ticks).read(start=args.start, end=args.end)
+        ts, prices = ticks['ts'], ticks['price']
+    elif args.ticks:
+        ticks = np.load(args.ticks, mmap_mode='r')
+        ts, prices = np.asarray(ticks[:, 0]), np.asarray(ticks[:, 1])
+    else:
+        ts, prices = synthetic_ticks(seconds=args.synthetic, phi=args.phi, seed=args.seed)
+    grid = resample(ts=ts, prices=prices)
+    print(f"Ticks: {len(ts)} | Grid: {len(grid)} s | Loaded in {perf_counter() - started:.2f}s")
+
+    start = max(args.window)
+    report(name='random', wins=evaluate(prices=grid, signals=np.random.default_rng(args.seed).integers(0, 2, len(grid)),
+                                        horizon=args.horizon, interval=args.interval, start=start),
+           max_combo=args.max_combo)
+    for window in args.window:
+        for name, strategy in STRATEGIES.items():
+            started = perf_counter()
+            signals = strategy(window=window).signals(prices=grid)
+            wins = evaluate(prices=grid, signals=signals, horizon=args.horizon, interval=args.interval, start=start)
+            report(name=f"{name} ({window}s)", wins=wins, max_combo=args.max_combo)
+            print(f"{'':<22} evaluated in {perf_counter() - started:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""Fleet load benchmark against the local OKX stand-in.
+
+Runs N simulated accounts through the real `Tapper` and `Scheduler` with fake init data and compressed
+sleeps, then reports request rate, CPU, memory per account and event-loop lag. Run from the repository root:
+
+    python -m benchmarks.fleet --accounts 1000 --duration 60 --time-scale 0.01
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import tempfile
+from time import perf_counter, process_time, time
+
+os.environ.setdefault('API_ID', '1')
+os.environ.setdefault('API_HASH', 'benchmark')
+
+import aiohttp
+from loguru import logger as loguru_logger
+
+import bot.utils  # noqa: F401 - initialises the logger and the launcher before the core modules
+from bot.config import settings
+from bot.core.connectors import connector_pool
+from bot.core.price import price_feed
+from bot.core.scheduler import Scheduler
+from bot.core.state import state_store
+from bot.core.tapper import Tapper, Hibernated
+from benchmarks.standin import StandIn, fake_init_data
+
+
+class BenchTapper(Tapper):
+    """Tapper that gets its init data from the stand-in instead of Telegram."""
+
+    __slots__ = ('index',)
+
+    def __init__(self, session_name: str, proxy: str | None = None):
+        super().__init__(session_name=session_name, proxy=proxy)
+        self.index = int(session_name.rsplit('_', 1)[1])
+
+    async def get_tg_web_data(self, proxy: str | None) -> str:
+        self.user_id = str(100000 + self.index)
+        self.first_name = f'bench{self.index}'
+        self.webapp.auth_date = int(time())
+        return fake_init_data(user_id=100000 + self.index, first_name=self.first_name)
+
+
+def rss_bytes() -> int:
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+
+
+def open_fds() -> int:
+    try:
+        return len(os.listdir('/proc/self/fd'))
+    except OSError:
+        return -1
+
+
+def serve(port: int, time_scale: float) -> None:
+    from aiohttp import web
+    web.run_app(StandIn(time_scale=time_scale).create_app(), host='127.0.0.1', port=port,
+                access_log=None, print=None)
+
+
+async def wait_ready(url: str) -> None:
+    async with aiohttp.ClientSession() as session:
+        for _ in range(100):
+            try:
+                async with session.get(f'{url}/stats') as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(delay=0.1)
+    raise RuntimeError("Stand-in server did not start")
+
+
+async def fetch_stats(url: str) -> dict:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f'{url}/stats') as response:
+            return await response.json()
+
+
+async def simulate_outage(url: str, start: float, duration: float, report: dict) -> None:
+    """Takes the Racer endpoints down for `duration` seconds and counts the requests that still reach them."""
+    await asyncio.sleep(delay=start)
+    before = await fetch_stats(url=url)
+    async with aiohttp.ClientSession() as session:
+        await session.post(f'{url}/outage', params={'seconds': duration})
+    await asyncio.sleep(delay=duration)
+    after = await fetch_stats(url=url)
+    report['requests'] = sum(count - before['requests'].get(endpoint, 0) for endpoint, count in after['requests'].items()
+                             if endpoint not in ('stats', 'ticker', 'outage'))
+
+
+async def sample_lag(samples: list[float], interval: float = 0.1) -> None:
+    while True:
+        start = perf_counter()
+        await asyncio.sleep(delay=interval)
+        samples.append(perf_counter() - start - interval)
+
+
+async def run(args: argparse.Namespace) -> None:
+    url = f'http://127.0.0.1:{args.port}'
+    settings.OKX_BASE_URL = url
+    settings.PRICE_FEED_URL = url
+    settings.DATA_DIR = tempfile.mkdtemp(prefix='okx-bench-')
+    settings.RANDOM_PREDICTION = not args.price_feed
+    # Rate limits and circuit cooldowns are expressed in real seconds, compress them together with the sleeps
+    settings.RATE_LIMIT_GLOBAL /= args.time_scale
+    settings.RATE_LIMIT_ENDPOINT /= args.time_scale
+    settings.RATE_LIMIT_PROXY /= args.time_scale
+    settings.CIRCUIT_COOLDOWN = [seconds * args.time_scale for seconds in settings.CIRCUIT_COOLDOWN]
+
+    await wait_ready(url=url)
+    before = await fetch_stats(url=url)
+
+    lag_samples: list[float] = []
+    lag_sampler = asyncio.create_task(sample_lag(samples=lag_samples))
+    rss_start = rss_bytes()
+    cpu_start = process_time()
+    started = perf_counter()
+
+    outage: dict = {}
+    if args.outage:
+        asyncio.create_task(simulate_outage(url=url, start=args.outage_at, duration=args.outage, report=outage))
+
+    BenchTapper.time_scale = args.time_scale
+    accounts = [Hibernated(factory=BenchTapper, session_name=f'bench_{index:05d}') for index in range(args.accounts)]
+    scheduler = Scheduler(concurrency=args.concurrency, time_scale=args.time_scale)
+    scheduler.spread(accounts=accounts, rate=args.start_rate, jitter=[0, 0])
+    del accounts
+
+    try:
+        await asyncio.wait_for(scheduler.run(), timeout=args.duration)
+    except asyncio.TimeoutError:
+        pass
+
+    elapsed = perf_counter() - started
+    cpu = process_time() - cpu_start
+    rss_end = rss_bytes()
+    open_files = open_fds()
+    hibernated = scheduler.hibernated
+    lag_sampler.cancel()
+    await price_feed.stop()
+    await connector_pool.close()
+    await state_store.close()
+
+    after = await fetch_stats(url=url)
+    requests = {endpoint: count - before['requests'].get(endpoint, 0) for endpoint, count in after['requests'].items()}
+    requests.pop('stats', None)
+    total = sum(requests.values())
+
+    lag_samples.sort()
+    # Rounds per game second is what a real fleet gets through, the wall-clock rate only reflects the time scale
+    print(f"Accounts: {args.accounts} | Duration: {elapsed:.1f}s | Time scale: {args.time_scale} | "
+          f"Rounds: {scheduler.ticks} ({scheduler.ticks / elapsed * args.time_scale:.2f} per game second) | "
+          f"Errors: {scheduler.errors}")
+    print(f"Requests: {total} ({total / elapsed:.1f}/s) | " +
+          ", ".join(f"{endpoint}: {count}" for endpoint, count in sorted(requests.items())))
+    print(f"CPU: {cpu:.1f}s ({cpu / elapsed * 100:.1f}% of one core) | "
+          f"{cpu / max(total, 1) * 1e6:.0f}us per request")
+    print(f"RSS: {rss_start / 2 ** 20:.1f} MiB -> {rss_end / 2 ** 20:.1f} MiB | "
+          f"{(rss_end - rss_start) / args.accounts / 1024:.1f} KiB per account | "
+          f"Hibernated at the end: {hibernated} | Open files: {open_files}")
+    if 'requests' in outage:
+        print(f"Outage: {args.outage:.0f}s | Racer requests during the outage: {outage['requests']} "
+              f"({outage['requests'] / args.outage:.1f}/s)")
+    if lag_samples:
+        print(f"Event loop lag: p50 {statistics.median(lag_samples) * 1000:.1f}ms | "
+              f"p99 {lag_samples[int(len(lag_samples) * 0.99)] * 1000:.1f}ms | max {lag_samples[-1] * 1000:.1f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=60, help="Wall-clock seconds to run the fleet")
+    parser.add_argument("--time-scale", type=float, default=0.01, help="Real seconds per bot/game second")
+    parser.add_argument("--concurrency", type=int, default=settings.MAX_CONCURRENCY)
+    parser.add_argument("--start-rate", type=float, default=500, help="Accounts started per second")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--price-feed", action='store_true', help="Predict from the shared price feed")
+    parser.add_argument("--verbose", action='store_true', help="Keep the bot log output")
+    parser.add_argument("--outage", type=float, default=0, help="Seconds the Racer endpoints answer 503")
+    parser.add_argument("--outage-at", type=float, default=5, help="Seconds after start the outage begins")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        loguru_logger.remove()
+        loguru_logger.add(sink=sys.stderr, level='ERROR')
+
+    server = multiprocessing.get_context('spawn').Process(target=serve, args=(args.port, args.time_scale), daemon=True)
+    server.start()
+    try:
+        asyncio.run(run(args=args))
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Memory per account for large fleets.
+
+Builds N accounts in each of the shapes they take at runtime and reports the growth of the Python heap
+(tracemalloc) and of RSS per account. `hibernated` is the record an idle account keeps on the scheduler's timer
+wheel, `idle` is a `Tapper` with its boosts and task ledger filled in, `open` also holds its HTTP session.
+Every measurement runs in a fresh interpreter. Run from the repository root:
+
+    python -m benchmarks.memory --accounts 1000 5000 10000
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+SHAPES = ('hibernated', 'idle', 'open')
+
+
+def rss_bytes() -> int:
+    with open('/proc/self/statm') as file:
+        return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+async def measure(args: argparse.Namespace) -> dict:
+    os.environ.setdefault('API_ID', '1')
+    os.environ.setdefault('API_HASH', 'benchmark')
+
+    import bot.utils  # noqa: F401 - initialises the logger and the launcher before the core modules
+    from aiocfscrape import CloudflareScraper  # noqa: F401 - imported by the first `open`, keep it out of the figures
+    from bot.config import settings
+    from bot.core import api
+    from bot.core.api import Boost, Task
+    from bot.core.boosts import BoostCatalog
+    from bot.core.connectors import connector_pool
+    from bot.core.state import state_store
+    from bot.core.tapper import Tapper, Hibernated
+    from benchmarks.api_decode import RESPONSES
+
+    settings.DATA_DIR = tempfile.mkdtemp(prefix='okx-memory-')
+    state_store.get(session_name='warmup')
+    connector_pool.get(proxy=None)
+
+    def catalog() -> BoostCatalog:
+        # Every account decodes its own response, like it does at runtime
+        boosts = BoostCatalog()
+        boosts.update(boosts=[Boost(item) for item in api.loads(RESPONSES['boosts'][2])['data']])
+        return boosts
+
+    gc.collect()
+    if args.trace:
+        tracemalloc.start()
+    heap_start = tracemalloc.get_traced_memory()[0] if args.trace else 0
+    rss_start = rss_bytes()
+
+    accounts = []
+    for index in range(args.accounts):
+        session_name = f'acc_{index:05d}'
+        state_store.get(session_name=session_name)
+        if args.shape == 'hibernated':
+            accounts.append(Hibernated(factory=Tapper, session_name=session_name, boost_catalog=catalog(),
+                                       max_chances=7, base_point=50, multiplier=2))
+            continue
+
+        tapper = Tapper(session_name=session_name)
+        tapper.boost_catalog = catalog()
+        tapper.task_ledger.pending(tasks=[Task(item) for item in api.loads(RESPONSES['tasks'][2])['data']])
+        if args.shape == 'open':
+            await tapper.open()
+        accounts.append(tapper)
+
+    gc.collect()
+    result = {
+        'heap': tracemalloc.get_traced_memory()[0] - heap_start if args.trace else 0,
+        'rss': rss_bytes() - rss_start,
+    }
+
+    if args.shape == 'open':
+        await asyncio.gather(*(tapper.close() for tapper in accounts))
+    await connector_pool.close()
+    return result
+
+
+def run_child(accounts: int, shape: str, trace: bool) -> dict:
+    command = [sys.executable, '-m', 'benchmarks.memory', '--child', '--accounts', str(accounts), '--shape', shape]
+    if trace:
+        command.append('--trace')
+    output = subprocess.run(command, check=True, capture_output=True, text=True, cwd=os.getcwd()).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--accounts", type=int, nargs='+', default=[1000, 5000, 10000])
+    parser.add_argument("--shape", choices=SHAPES, nargs='+', default=list(SHAPES))
+    parser.add_argument("--child", action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument("--trace", action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        args.accounts, args.shape = args.accounts[0], args.shape[0]
+        print(json.dumps(asyncio.run(measure(args=args))))
+        return
+
+    print(f"{'accounts':>8}  {'shape':<12}{'heap/account':>14}{'RSS/account':>14}{'RSS total':>12}")
+    for accounts in args.accounts:
+        for shape in args.shape:
+            # tracemalloc's own bookkeeping would show up in RSS, so the two are measured in separate runs
+            heap = run_child(accounts=accounts, shape=shape, trace=True)['heap']
+            rss = run_child(accounts=accounts, shape=shape, trace=False)['rss']
+            print(f"{accounts:>8}  {shape:<12}{heap / accounts:>12.0f} B{rss / accounts:>12.0f} B"
+                  f"{rss / 2 ** 20:>8.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""Offline replay of recorded OKX cassettes.
+
+Feeds the exchanges recorded with `CASSETTE_DIR` back to the real `Tapper` and `Scheduler`, with the recorded
+latencies and the bot's own sleeps divided by `--speed`, and reports CPU per request and event-loop lag. Record
+a cassette against the stand-in or a live run, then replay it without network access. Run from the repository root:
+
+    CASSETTE_DIR=data/cassettes python -m benchmarks.fleet --accounts 100 --duration 30
+    python -m benchmarks.replay data/cassettes --speed 100
+"""
+import argparse
+import asyncio
+import glob
+import os
+import statistics
+import sys
+import tempfile
+from time import perf_counter, process_time, time
+
+os.environ.setdefault('API_ID', '1')
+os.environ.setdefault('API_HASH', 'benchmark')
+
+from loguru import logger as loguru_logger
+
+import bot.utils  # noqa: F401 - initialises the logger and the launcher before the core modules
+from bot.config import settings
+from bot.core.cassette import Cassette, CassetteExhausted, ReplayClient
+from bot.core.connectors import connector_pool
+from bot.core.price import price_feed
+from bot.core.scheduler import Scheduler
+from bot.core.state import state_store
+from bot.core.tapper import Tapper, Hibernated
+from bot.exceptions import InvalidSession
+from benchmarks.fleet import sample_lag
+
+
+class ReplayTapper(Tapper):
+    """Tapper that talks to a cassette instead of OKX and Telegram."""
+
+    __slots__ = ()
+
+    cassettes: dict[str, Cassette] = {}
+    speed = 1.0
+    finished = 0
+
+    def create_http_client(self) -> ReplayClient:
+        return ReplayClient(cassette=self.cassettes[self.session_name], speed=self.speed)
+
+    async def get_tg_web_data(self, proxy: str | None) -> str:
+        record = self.cassettes[self.session_name].next_init()
+        self.user_id = record['user_id']
+        self.first_name = record['first_name']
+        self.last_name = record['last_name']
+        # The recorded auth date is in the past, the token has to look fresh to the replayed run
+        self.webapp.auth_date = int(time())
+        return record['init_data']
+
+    async def tick(self) -> float:
+        try:
+            return await super().tick()
+        except CassetteExhausted:
+            # The scheduler drops sessions that raise `InvalidSession`, which is what a finished cassette is
+            ReplayTapper.finished += 1
+            raise InvalidSession(self.session_name)
+
+
+async def run(args: argparse.Namespace) -> None:
+    paths = sorted(glob.glob(os.path.join(args.directory, '*.jsonl.gz')))
+    if not paths:
+        raise SystemExit(f"No cassettes in {args.directory}")
+
+    ReplayTapper.cassettes = {cassette.session_name: cassette for cassette in map(Cassette, paths)}
+    ReplayTapper.speed = args.speed
+    ReplayTapper.time_scale = time_scale = 1 / args.speed
+    recorded = sum(cassette.requests for cassette in ReplayTapper.cassettes.values())
+
+    settings.CASSETTE_DIR = ""
+    settings.DATA_DIR = tempfile.mkdtemp(prefix='okx-replay-')
+    settings.RANDOM_PREDICTION = True
+    settings.RATE_LIMIT_GLOBAL /= time_scale
+    settings.RATE_LIMIT_ENDPOINT /= time_scale
+    settings.RATE_LIMIT_PROXY /= time_scale
+    settings.CIRCUIT_COOLDOWN = [seconds * time_scale for seconds in settings.CIRCUIT_COOLDOWN]
+
+    lag_samples: list[float] = []
+    lag_sampler = asyncio.create_task(sample_lag(samples=lag_samples))
+    cpu_start = process_time()
+    started = perf_counter()
+
+    accounts = [Hibernated(factory=ReplayTapper, session_name=session_name) for session_name in ReplayTapper.cassettes]
+    scheduler = Scheduler(concurrency=args.concurrency, time_scale=time_scale)
+    scheduler.spread(accounts=accounts, rate=args.start_rate, jitter=[0, 0])
+    del accounts
+
+    try:
+        await asyncio.wait_for(scheduler.run(), timeout=args.duration)
+    except asyncio.TimeoutError:
+        pass
+
+    elapsed = perf_counter() - started
+    cpu = process_time() - cpu_start
+    lag_sampler.cancel()
+    await price_feed.stop()
+    await connector_pool.close()
+    await state_store.close()
+
+    left = sum(len(queue) for cassette in ReplayTapper.cassettes.values() for queue in cassette.http.values())
+    replayed = recorded - left
+    lag_samples.sort()
+    print(f"Cassettes: {len(paths)} | Finished: {ReplayTapper.finished} | Duration: {elapsed:.1f}s | "
+          f"Speed: {args.speed:g}x | Rounds: {scheduler.ticks} | Errors: {scheduler.errors - ReplayTapper.finished}")
+    print(f"Requests: {replayed} of {recorded} replayed ({replayed / elapsed:.1f}/s) | Not reached: {left}")
+    print(f"CPU: {cpu:.1f}s ({cpu / elapsed * 100:.1f}% of one core) | "
+          f"{cpu / max(replayed, 1) * 1e6:.0f}us per request")
+    if lag_samples:
+        print(f"Event loop lag: p50 {statistics.median(lag_samples) * 1000:.1f}ms | "
+              f"p99 {lag_samples[int(len(lag_samples) * 0.99)] * 1000:.1f}ms | max {lag_samples[-1] * 1000:.1f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory", help="Directory the cassettes were recorded to (CASSETTE_DIR)")
+    parser.add_argument("--speed", type=float, default=1, help="Replay speed, 1 keeps the recorded timing")
+    parser.add_argument("--duration", type=float, default=None, help="Stop after this many wall-clock seconds")
+    parser.add_argument("--concurrency", type=int, default=settings.MAX_CONCURRENCY)
+    parser.add_argument("--start-rate", type=float, default=500, help="Accounts started per second")
+    parser.add_argument("--verbose", action='store_true', help="Keep the bot log output")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        loguru_logger.remove()
+        loguru_logger.add(sink=sys.stderr, level='CRITICAL')
+
+    asyncio.run(run(args=args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""Local stand-in for the OKX Racer API and the BTC-USDT ticker.
+
+Keeps per-user game state (chances and their refresh timer, combo, boost stages, tasks) in memory, so
+`Tapper` can be exercised without the live API and Telegram. Game timers are multiplied by `time_scale`,
+so 0.01 turns the 600 s chance refresh into 6 s. Run standalone from the repository root:
+
+    python -m benchmarks.standin --port 8080 --time-scale 0.01
+"""
+import argparse
+import json
+from collections import Counter
+from random import gauss, random
+from time import time
+from urllib.parse import quote
+
+from aiohttp import web
+
+
+RACER_PATH = '/priapi/v1/affiliate/game/racer'
+AUTH_EXPIRED_CODE = 499004
+
+BASE_CHANCES = 7
+REFRESH_SECONDS = 600
+BASE_POINT = 50
+
+BOOSTS = (
+    # id, name, total stage, base cost
+    (1, 'Reload Fuel Tank', 6, 0),
+    (2, 'Fuel Tank', 5, 2000),
+    (3, 'Turbo Charger', 5, 2000),
+)
+TASKS = tuple((task_id, f'Task {task_id}', 500 * task_id) for task_id in range(1, 11))
+
+
+def fake_init_data(user_id: int, first_name: str, last_name: str = '') -> str:
+    """Returns init data shaped like the one built by `InitData.to_query`."""
+    user = json.dumps({"id": user_id, "first_name": first_name, "last_name": last_name, "username": first_name,
+                       "language_code": "en", "allows_write_to_pm": True}, separators=(',', ':'))
+    return f"query_id=AAH{user_id}&user={quote(user)}&auth_date={int(time())}&hash={user_id:064x}"
+
+
+class Player:
+    __slots__ = ('balance', 'chances', 'refresh_at', 'combo', 'stages', 'tasks', 'time_scale')
+
+    def __init__(self, time_scale: float):
+        self.time_scale = time_scale
+        self.balance = 0
+        self.chances = BASE_CHANCES
+        self.refresh_at = 0.0
+        self.combo = 0
+        self.stages = {boost_id: 0 for boost_id, *_ in BOOSTS}
+        self.tasks = {task_id: 0 for task_id, *_ in TASKS}
+
+    @property
+    def max_chances(self) -> int:
+        return BASE_CHANCES + self.stages[2]
+
+    def refresh(self) -> None:
+        now = time()
+        while self.chances < self.max_chances and self.refresh_at and self.refresh_at <= now:
+            self.chances += 1
+            self.refresh_at = self.refresh_at + REFRESH_SECONDS * self.time_scale if self.chances < self.max_chances else 0
+
+    def second_to_refresh(self) -> int:
+        if not self.refresh_at:
+            return 0
+        return max(0, int((self.refresh_at - time()) / self.time_scale))
+
+    def boost_cost(self, boost_id: int) -> int:
+        base_cost = next(cost for _id, _, _, cost in BOOSTS if _id == boost_id)
+        return base_cost * 2 ** self.stages[boost_id]
+
+
+class StandIn:
+    def __init__(self, time_scale: float = 1.0):
+        self.time_scale = time_scale
+        self.players: dict[str, Player] = {}
+        self.requests = Counter()
+        self.price = 60000.0
+        self.price_ts = time()
+        self.down_until = 0.0
+
+    def player(self, user_id: str) -> Player:
+        player = self.players.get(user_id)
+        if player is None:
+            player = self.players[user_id] = Player(time_scale=self.time_scale)
+        player.refresh()
+        return player
+
+    def ticker(self) -> float:
+        now = time()
+        steps = int((now - self.price_ts) / max(self.time_scale, 1e-6))
+        for _ in range(min(steps, 100)):
+            self.price = round(self.price + gauss(0, 5), 1)
+        if steps:
+            self.price_ts = now
+        return self.price
+
+    def create_app(self) -> web.Application:
+        app = web.Application(middlewares=[self.count_requests])
+        app.router.add_post(f'{RACER_PATH}/info', self.info)
+        app.router.add_get(f'{RACER_PATH}/tasks', self.tasks)
+        app.router.add_post(f'{RACER_PATH}/task', self.task)
+        app.router.add_get(f'{RACER_PATH}/boosts', self.boosts)
+        app.router.add_post(f'{RACER_PATH}/boost', self.boost)
+        app.router.add_post(f'{RACER_PATH}/assess', self.assess)
+        app.router.add_get('/api/v5/market/ticker', self.market_ticker)
+        app.router.add_get('/stats', self.stats)
+        app.router.add_post('/outage', self.outage)
+        return app
+
+    @web.middleware
+    async def count_requests(self, request: web.Request, handler):
+        self.requests[request.path.rsplit('/', 1)[-1]] += 1
+        if request.path.startswith(RACER_PATH) and time() < self.down_until:
+            return web.json_response({"code": 503, "data": {}, "msg": "Service Unavailable"}, status=503)
+        if request.path.startswith(RACER_PATH) and not request.headers.get('X-Telegram-Init-Data'):
+            return web.json_response({"code": AUTH_EXPIRED_CODE, "data": {}, "msg": "Unauthorized"})
+        return await handler(request)
+
+    @staticmethod
+    def ok(data) -> web.Response:
+        return web.json_response({"code": 0, "data": data, "msg": ""})
+
+    async def info(self, request: web.Request) -> web.Response:
+        player = self.player(user_id=str((await request.json())['extUserId']))
+        return self.ok({"balancePoints": player.balance, "numChances": player.chances,
+                        "secondToRefresh": player.second_to_refresh(), "curCombo": player.combo})
+
+    async def tasks(self, request: web.Request) -> web.Response:
+        player = self.player(user_id=request.query['extUserId'])
+        return self.ok([{"id": task_id, "state": player.tasks[task_id], "points": points,
+                         "context": {"name": name}} for task_id, name, points in TASKS])
+
+    async def task(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        player = self.player(user_id=str(body['extUserId']))
+        task_id = int(body['id'])
+        if player.tasks.get(task_id) == 0:
+            player.tasks[task_id] = 1
+            player.balance += next(points for _id, _, points in TASKS if _id == task_id)
+        return self.ok({})
+
+    async def boosts(self, request: web.Request) -> web.Response:
+        player = self.player(user_id=request.query['extUserId'])
+        return self.ok([{"id": boost_id, "pointCost": player.boost_cost(boost_id), "curStage": player.stages[boost_id],
+                         "totalStage": total_stage, "context": {"name": name}}
+                        for boost_id, name, total_stage, _ in BOOSTS])
+
+    async def boost(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        player = self.player(user_id=str(body['extUserId']))
+        boost_id = int(body['id'])
+        total_stage = next(total for _id, _, total, _ in BOOSTS if _id == boost_id)
+        cost = player.boost_cost(boost_id)
+        if player.stages[boost_id] >= total_stage or player.balance < cost:
+            return web.json_response({"code": 1, "data": {}, "msg": "Can not buy boost"})
+
+        player.balance -= cost
+        player.stages[boost_id] += 1
+        if boost_id == 1:
+            player.chances = player.max_chances
+            player.refresh_at = 0
+        return self.ok({})
+
+    async def assess(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        player = self.player(user_id=str(body['extUserId']))
+        if player.chances <= 0:
+            return web.json_response({"code": 2, "data": {}, "msg": "No chances"})
+
+        player.chances -= 1
+        if not player.refresh_at:
+            player.refresh_at = time() + REFRESH_SECONDS * self.time_scale
+
+        won = random() < 0.5
+        multiplier = 1 + player.stages[3]
+        if won:
+            player.combo += 1
+            player.balance += BASE_POINT * multiplier
+        else:
+            player.combo = 0
+
+        return self.ok({"won": won, "basePoint": BASE_POINT, "multiplier": multiplier,
+                        "balancePoints": player.balance, "numChance": player.chances, "curCombo": player.combo})
+
+    async def market_ticker(self, request: web.Request) -> web.Response:
+        return web.json_response({"code": "0", "msg": "", "data": [{
+            "instId": request.query.get('instId', 'BTC-USDT'), "last": str(self.ticker()), "ts": str(int(time() * 1000))
+        }]})
+
+    async def outage(self, request: web.Request) -> web.Response:
+        """Makes the Racer endpoints answer 503 for the next `seconds` seconds."""
+        self.down_until = time() + float(request.query['seconds'])
+        return web.json_response({"down_until": self.down_until})
+
+    async def stats(self, _: web.Request) -> web.Response:
+        return web.json_response({"players": len(self.players), "requests": dict(self.requests)})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default='127.0.0.1')
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Real seconds per game second")
+    args = parser.parse_args()
+
+    web.run_app(StandIn(time_scale=args.time_scale).create_app(), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""Startup benchmark for large session directories.
+
+Creates N empty session files in a scratch directory, then starts the clicker against the local OKX stand-in in a
+fresh interpreter through `launcher.run_tasks`, with the session check on a cold cache (`--no-check` skips it).
+Reports import time, time to the first OKX request and RSS per account. The stand-in checks hold no Telegram
+connection, so the first round waits for a handshake window that a real, still connected check would not need. `--eager` also builds a Pyrogram client
+for every session up front, the way the launcher used to. Run from the repository root:
+
+    python -m benchmarks.startup --sessions 10000
+    python -m benchmarks.startup --sessions 10000 --eager
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+from time import perf_counter, time
+
+STARTED = perf_counter()
+
+
+def rss_bytes() -> int:
+    with open('/proc/self/statm') as file:
+        return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+async def measure(args: argparse.Namespace) -> dict:
+    result = {'interpreter_rss': rss_bytes()}
+    os.environ.setdefault('API_ID', '1')
+    os.environ.setdefault('API_HASH', 'benchmark')
+
+    import bot.utils  # noqa: F401 - initialises the logger and the launcher before the core modules
+    from loguru import logger
+    from bot.config import settings
+    from bot.core.scheduler import Scheduler
+    from bot.core.sessions import SessionValidator
+    from bot.core.tapper import Tapper
+    from bot.core.telegram import create_client, telegram_gateway
+    from bot.utils import launcher
+    from benchmarks.standin import fake_init_data
+
+    result['import_seconds'] = perf_counter() - STARTED
+    result['import_rss'] = rss_bytes()
+    logger.remove()
+    logger.add(sink=sys.stderr, level='ERROR')
+    settings.OKX_BASE_URL = f'http://127.0.0.1:{args.port}'
+    settings.DATA_DIR = os.path.join(args.workdir, 'data')
+    settings.RATE_LIMIT_GLOBAL = settings.RATE_LIMIT_ENDPOINT = settings.RATE_LIMIT_PROXY = 1e6
+    settings.START_DELAY = [0, 0]
+    settings.SESSION_CHECK = not args.no_check
+    settings.LOOP_LAG_INTERVAL = 0
+
+    first_request = asyncio.Event()
+
+    class StartupTapper(Tapper):
+        """Goes through the Telegram gateway like a real auth, but gets the init data from the stand-in."""
+
+        __slots__ = ()
+
+        time_scale = 0.01
+
+        async def get_tg_web_data(self, proxy: str | None) -> str:
+            async with telegram_gateway.session(session_name=self.session_name, proxy=proxy):
+                index = int(self.session_name.rsplit('_', 1)[1])
+                self.user_id = str(100000 + index)
+                self.first_name = self.session_name
+                self.webapp.auth_date = int(time())
+                return fake_init_data(user_id=100000 + index, first_name=self.first_name)
+
+        async def get_info_data(self):
+            info = await super().get_info_data()
+            if not first_request.is_set():
+                result['first_request_seconds'] = perf_counter() - STARTED
+                result['first_request_rss'] = rss_bytes()
+                first_request.set()
+            return info
+
+    class StartupValidator(SessionValidator):
+        """Takes a Telegram gateway slot like a real check and answers `get_me` after a typical round trip."""
+
+        checked = 0
+
+        async def check(self, session_name: str, proxy: str | None) -> tuple[bool | None, str]:
+            async with telegram_gateway.session(session_name=session_name, proxy=proxy):
+                await asyncio.sleep(delay=0.2)
+            StartupValidator.checked += 1
+            return True, session_name
+
+    session_names = launcher.get_session_names()
+    launcher.check_sessions(session_names=session_names)
+    result['scan_seconds'] = perf_counter() - STARTED - result['import_seconds']
+
+    clients = [create_client(session_name=session_name) for session_name in session_names] if args.eager else []
+    result['build_seconds'] = perf_counter() - STARTED - result['import_seconds'] - result['scan_seconds']
+    result['build_rss'] = rss_bytes()
+
+    scheduler = Scheduler(concurrency=settings.MAX_CONCURRENCY, time_scale=StartupTapper.time_scale)
+    runner = asyncio.create_task(launcher.run_tasks(session_names=session_names, scheduler=scheduler,
+                                                    start_rate=args.start_rate, factory=StartupTapper,
+                                                    validator=StartupValidator()))
+    await first_request.wait()
+    await asyncio.sleep(delay=args.duration)
+    result['rounds'] = scheduler.ticks
+    result['checked'] = StartupValidator.checked
+    result['run_rss'] = rss_bytes()
+    result['accounts'] = len(session_names)
+    result['clients'] = len(clients)
+
+    # run_tasks closes the connectors, the state store and the gateway on its way out
+    runner.cancel()
+    await asyncio.gather(runner, return_exceptions=True)
+    return result
+
+
+def child(args: argparse.Namespace) -> None:
+    os.chdir(args.workdir)
+    sys.path.insert(0, args.root)
+    print(json.dumps(asyncio.run(measure(args=args))))
+
+
+def serve(port: int) -> None:
+    from benchmarks.fleet import serve as serve_standin
+    serve_standin(port=port, time_scale=0.01)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--eager", action='store_true', help="Build every Pyrogram client before starting")
+    parser.add_argument("--no-check", action='store_true', help="Start without the session check")
+    parser.add_argument("--duration", type=float, default=5, help="Seconds to keep running after the first request")
+    parser.add_argument("--start-rate", type=float, default=1000, help="Accounts started per second")
+    parser.add_argument("--port", type=int, default=18081)
+    parser.add_argument("--child", action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    parser.add_argument("--root", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args=args)
+        return
+
+    workdir = tempfile.mkdtemp(prefix='okx-startup-')
+    os.makedirs(os.path.join(workdir, 'sessions'))
+    for index in range(args.sessions):
+        open(os.path.join(workdir, 'sessions', f'bench_{index:05d}.session'), 'wb').close()
+
+    server = multiprocessing.get_context('spawn').Process(target=serve, args=(args.port,), daemon=True)
+    server.start()
+    try:
+        from benchmarks.fleet import wait_ready
+        asyncio.run(wait_ready(url=f'http://127.0.0.1:{args.port}'))
+
+        command = [sys.executable, '-m', 'benchmarks.startup', '--child', '--workdir', workdir, '--root', os.getcwd(),
+                   '--port', str(args.port), '--duration', str(args.duration), '--start-rate', str(args.start_rate)]
+        if args.eager:
+            command.append('--eager')
+        if args.no_check:
+            command.append('--no-check')
+        output = subprocess.run(command, check=True, capture_output=True, text=True, cwd=os.getcwd()).stdout
+    finally:
+        server.terminate()
+        server.join()
+
+    result = json.loads(output.strip().splitlines()[-1])
+    mib = 2 ** 20
+    print(f"Sessions: {result['accounts']} | Pyrogram clients built up front: {result['clients']} | "
+          f"Sessions checked: {result['checked']} | Rounds: {result['rounds']}")
+    print(f"Imports: {result['import_seconds']:.2f}s | Session scan: {result['scan_seconds']:.2f}s | "
+          f"Account setup: {result['build_seconds']:.2f}s | First OKX request: {result['first_request_seconds']:.2f}s")
+    print(f"RSS: interpreter {result['interpreter_rss'] / mib:.1f} MiB -> imports {result['import_rss'] / mib:.1f} MiB "
+          f"-> first request {result['first_request_rss'] / mib:.1f} MiB -> running {result['run_rss'] / mib:.1f} MiB | "
+          f"{(result['first_request_rss'] - result['build_rss']) / result['accounts'] / 1024:.1f} KiB per account "
+          f"at startup")
+
+
+if __name__ == '__main__':
+    main()
@@ -8,15 +8,90 @@ class Settings(BaseSettings):
     API_HASH: str
 
     SLEEP_TIME: list[int] = [300, 500]
-    START_DELAY: list[int] = [25, 55]
+    START_DELAY: list[int] = [0, 15]
+    START_RATE: float = 1
+    MAX_CONCURRENCY: int = 100
+    HIBERNATE_AFTER: int = 120
+    HIBERNATE_RESOLUTION: float = 1
+    USE_UVLOOP: bool = False
     MAX_COMBO_COUNT: int = 28
     AUTO_TASK: bool = True
+    SKIP_TASKS: list[int] = [5, 9]
+    TASK_CONCURRENCY: int = 3
+    TASK_MAX_FAILURES: int = 3
+    TASKS_REFRESH_INTERVAL: int = 43200
     REF_ID: str = "134115058"
     RANDOM_PREDICTION: bool = True
+    PREDICTION_STRATEGY: str = "momentum"
+    PREDICTION_WINDOW: int = 3
     FUEL_TANK_BOOST: bool = True
     RELOAD_TANK_BOOST: bool = True
     TURBO_CHARGER_BOOST: bool = True
+    BOOST_PAYBACK_HOURS: int = 72
+    BOOST_CACHE_TTL: int = 21600
+    INFO_REFRESH_INTERVAL: int = 3600
     USE_PROXY_FROM_FILE: bool = False
+    PROXY_CHECK_URL: str = "https://httpbin.org/ip"
+    PROXY_CHECK_TIMEOUT: float = 5
+    PROXY_CHECK_CONCURRENCY: int = 50
+    PROXY_CHECK_TTL: int = 1800
+    PROXY_RECHECK_INTERVAL: float = 30
+    PROXY_MAX_FAILURES: int = 3
+    DATA_DIR: str = "data"
+    INIT_DATA_TTL: int = 3000
+    STATE_FLUSH_INTERVAL: float = 5
+    OKX_BASE_URL: str = "https://www.okx.com"
+
+    PRICE_FEED_WS: bool = False
+    PRICE_FEED_URL: str = "https://www.okx.com"
+    PRICE_FEED_WS_URL: str = "wss://ws.okx.com:8443/ws/v5/public"
+    PRICE_POLL_INTERVAL: float = 1
+    TICK_RECORDER: bool = False
+    TICK_FILE_SIZE: int = 16777216
+
+    HTTP_POOL_LIMIT: int = 100
+    HTTP_LIMIT_PER_HOST: int = 20
+    HTTP_KEEPALIVE_TIMEOUT: float = 60
+    DNS_CACHE_TTL: int = 600
+
+    RATE_LIMIT_GLOBAL: float = 100
+    RATE_LIMIT_ENDPOINT: float = 50
+    RATE_LIMIT_PROXY: float = 20
+    RATE_LIMIT_MIN_FACTOR: float = 0.05
+    RATE_LIMIT_PAUSE: float = 5
+    TELEGRAM_RATE_LIMIT: float = 2
+    TELEGRAM_MAX_CONNECTIONS: int = 10
+    TELEGRAM_BATCH_SIZE: int = 10
+    TELEGRAM_BATCH_WINDOW: float = 5
+    TELEGRAM_KEEPALIVE: float = 30
+    ERROR_BACKOFF: list[int] = [5, 120]
+    OKX_RETRIES: int = 2
+    CIRCUIT_FAILURES: int = 10
+    CIRCUIT_COOLDOWN: list[float] = [10, 300]
+    CIRCUIT_PROBES: int = 2
+    CASSETTE_DIR: str = ""
+    SESSION_CHECK: bool = True
+    SESSION_CHECK_INTERVAL: int = 86400
+
+    METRICS_HOST: str = "127.0.0.1"
+    METRICS_PORT: int = 0
+    METRICS_FILE: str = ""
+    METRICS_INTERVAL: int = 60
+
+    LOG_ENQUEUE: bool = True
+    LOG_JSON: bool = False
+    LOG_FILE: str = ""
+    LOG_ROTATION: str = "50 MB"
+    LOG_RETENTION: str = "7 days"
+    LOG_COMPRESSION: str = "gz"
+    LOG_SAMPLE_INTERVAL: float = 0
+    LOG_SUMMARY_INTERVAL: float = 0
+
+    LOOP_LAG_INTERVAL: float = 1
+    SLOW_CALLBACK_THRESHOLD: float = 0
+    PROFILE_DIR: str = "data/profiles"
+    PROFILE_DURATION: float = 60
+    PROFILE_ON_START: bool = False
 
 
 settings = Settings()
@@ -0,0 +1,220 @@
+import asyncio
+import json
+import sys
+from random import uniform
+from time import time, perf_counter
+from urllib.parse import parse_qsl, quote, urlsplit
+
+import aiohttp
+
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:
+    loads = json.loads
+
+
+AUTH_EXPIRED_CODE = 499004
+
+
+class InitData:
+    """Telegram WebApp init data parsed from the web view url."""
+
+    __slots__ = ('query_id', 'user', 'auth_date', 'hash', 'user_id', 'first_name', 'last_name')
+
+    def __init__(self, query_id: str, user: str, auth_date: int, hash_: str):
+        self.query_id = query_id
+        self.user = user
+        self.auth_date = auth_date
+        self.hash = hash_
+
+        user_data = loads(user)
+        self.user_id = str(user_data['id'])
+        self.first_name = user_data.get('first_name', '')
+        self.last_name = user_data.get('last_name', '')
+
+    @classmethod
+    def from_url(cls, url: str) -> 'InitData':
+        fragment = dict(parse_qsl(urlsplit(url).fragment, keep_blank_values=True))
+        params = dict(parse_qsl(fragment['tgWebAppData'], keep_blank_values=True))
+        return cls(query_id=params.get('query_id', ''), user=params['user'],
+                   auth_date=int(params['auth_date']), hash_=params['hash'])
+
+    def to_query(self) -> str:
+        return f"query_id={self.query_id}&user={quote(self.user)}&auth_date={self.auth_date}&hash={self.hash}"
+
+
+class RacerInfo:
+    __slots__ = ('balance_points', 'num_chances', 'second_to_refresh')
+
+    def __init__(self, data: dict):
+        self.balance_points = int(data['balancePoints'])
+        self.num_chances = int(data['numChances'])
+        self.second_to_refresh = int(data.get('secondToRefresh') or 0)
+
+
+class Task:
+    __slots__ = ('id', 'state', 'name', 'points')
+
+    def __init__(self, data: dict):
+        self.id = int(data['id'])
+        self.state = int(data['state'])
+        # Every account gets the same names, interning keeps a single copy of each
+        self.name = sys.intern(data['context']['name'])
+        self.points = int(data.get('points') or 0)
+
+
+class Boost:
+    __slots__ = ('id', 'name', 'point_cost', 'cur_stage', 'total_stage')
+
+    def __init__(self, data: dict):
+        self.id = int(data['id'])
+        self.name = sys.intern(data['context']['name'])
+        self.point_cost = int(data['pointCost'])
+        self.cur_stage = int(data['curStage'])
+        self.total_stage = int(data['totalStage'])
+
+
+class AssessResult:
+    __slots__ = ('won', 'base_point', 'multiplier', 'balance_points', 'num_chance', 'cur_combo')
+
+    def __init__(self, data: dict):
+        self.won = bool(data['won'])
+        self.base_point = int(data.get('basePoint') or 0)
+        self.multiplier = int(data.get('multiplier') or 0)
+        self.balance_points = int(data['balancePoints'])
+        self.num_chance = int(data['numChance'])
+        self.cur_combo = int(data.get('curCombo') or 0)
+
+    @property
+    def added_points(self) -> int:
+        return self.base_point * self.multiplier if self.won else 0
+
+
+class RacerClient:
+    """Thin client for the OKX Racer endpoints returning slotted models instead of raw json."""
+
+    __slots__ = ('http_client', 'base_url', 'user_id', 'user_name', 'link_code', 'metrics', 'limiter', 'proxy_label',
+                 'breaker', 'retries', 'recorder')
+
+    def __init__(self, http_client: aiohttp.ClientSession, link_code: str, base_url: str = 'https://www.okx.com',
+                 metrics=None, limiter=None, proxy_label: str = 'direct', breaker=None, retries: int = 0,
+                 recorder=None):
+        self.http_client = http_client
+        self.base_url = f'{base_url}/priapi/v1/affiliate/game/racer'
+        self.link_code = link_code
+        self.metrics = metrics
+        self.limiter = limiter
+        self.proxy_label = proxy_label
+        self.breaker = breaker
+        self.retries = retries
+        self.recorder = recorder
+        self.user_id = ''
+        self.user_name = ''
+
+    async def _request(self, method: str, path: str, params: dict | None = None, json_data: dict | None = None,
+                       retries: int = 0) -> dict:
+        """Sends the request through the endpoint's circuit breaker.
+
+        Read-only calls pass `retries` to be repeated after 5xx and connection errors, with jittered
+        exponential delays, the rest fail on the first error so nothing is played or bought twice.
+        """
+        attempt = 0
+        while True:
+            if self.breaker:
+                self.breaker.check(endpoint=path)
+            try:
+                payload = await self._send(method=method, path=path, params=params, json_data=json_data)
+            except Exception as error:
+                status = error.status if isinstance(error, aiohttp.ClientResponseError) else None
+                if self.breaker and status is not None:
+                    # Connection and proxy errors say nothing about OKX, they count against the account's proxy
+                    self.breaker.record(endpoint=path, ok=status < 500)
+                if (status is not None and status < 500) or attempt >= retries:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay=uniform(0, 0.5 * 2 ** attempt))
+                continue
+
+            if self.breaker:
+                self.breaker.record(endpoint=path, ok=True)
+            return payload
+
+    async def _send(self, method: str, path: str, params: dict | None = None, json_data: dict | None = None) -> dict:
+        params = {**params, 't': int(time() * 1000)} if params else {'t': int(time() * 1000)}
+        if self.limiter:
+            await self.limiter.acquire(endpoint=path, proxy=self.proxy_label)
+
+        start = perf_counter()
+        status = 'error'
+        retry_after = 0.0
+        try:
+            async with self.http_client.request(method=method, url=f'{self.base_url}/{path}',
+                                                params=params, json=json_data) as response:
+                status = response.status
+                header = response.headers.get('Retry-After', '')
+                retry_after = float(header) if status == 429 and header.isdigit() else 0.0
+                body = await response.read()
+                if self.recorder:
+                    self.recorder.http(method=method, path=path, status=status, latency=perf_counter() - start,
+                                       body=body, retry_after=header)
+                try:
+                    payload = loads(body)
+                except ValueError:
+                    response.raise_for_status()
+                    raise
+
+                if response.status >= 400 and payload.get('code') != AUTH_EXPIRED_CODE:
+                    response.raise_for_status()
+
+                if self.metrics and payload.get('code') not in (0, None):
+                    self.metrics.inc('okx_api_errors_total', endpoint=path, code=payload.get('code'))
+
+                return payload
+        finally:
+            if self.recorder and status == 'error':
+                self.recorder.http(method=method, path=path, status=0, latency=perf_counter() - start)
+            if self.limiter:
+                self.limiter.report(endpoint=path, proxy=self.proxy_label, status=status, retry_after=retry_after)
+            if self.metrics:
+                self.metrics.observe('okx_request_duration_seconds', perf_counter() - start,
+                                     endpoint=path, proxy=self.proxy_label)
+                self.metrics.inc('okx_requests_total', endpoint=path, status=status)
+
+    async def info(self) -> RacerInfo:
+        payload = await self._request(method='POST', path='info', json_data={
+            "extUserId": self.user_id,
+            "extUserName": self.user_name,
+            "gameId": 1,
+            "linkCode": self.link_code
+        }, retries=self.retries)
+        return RacerInfo(payload['data'])
+
+    async def tasks(self) -> list[Task]:
+        payload = await self._request(method='GET', path='tasks', params={'extUserId': self.user_id},
+                                      retries=self.retries)
+        return [Task(task) for task in payload['data']]
+
+    async def perform_task(self, task_id: int) -> dict:
+        return await self._request(method='POST', path='task', json_data={"extUserId": self.user_id, "id": task_id})
+
+    async def boosts(self) -> list[Boost]:
+        payload = await self._request(method='GET', path='boosts', params={'extUserId': self.user_id},
+                                      retries=self.retries)
+        return [Boost(boost) for boost in payload.get('data') or []]
+
+    async def buy_boost(self, boost_id: int) -> bool:
+        payload = await self._request(method='POST', path='boost', json_data={"extUserId": self.user_id, "id": boost_id})
+        return payload.get('code') == 0
+
+    async def assess(self, predict: int) -> AssessResult | None:
+        """Returns None when the init data was rejected and the token must be refreshed."""
+        payload = await self._request(method='POST', path='assess', json_data={
+            "extUserId": self.user_id,
+            "predict": predict,
+            "gameId": 1
+        })
+        if payload.get('code') == AUTH_EXPIRED_CODE:
+            return None
+
+        return AssessResult(payload['data'])
@@ -0,0 +1,112 @@
+from datetime import datetime, timezone
+from time import time
+
+from bot.config import settings
+from .api import Boost
+
+
+RELOAD_FUEL_TANK = 1
+FUEL_TANK = 2
+TURBO_CHARGER = 3
+
+
+def is_enabled(boost: Boost) -> bool:
+    match boost.name:
+        case 'Fuel Tank':
+            return settings.FUEL_TANK_BOOST
+        case 'Reload Fuel Tank':
+            return settings.RELOAD_TANK_BOOST
+        case 'Turbo Charger':
+            return settings.TURBO_CHARGER_BOOST
+        case _:
+            return False
+
+
+class BoostCatalog:
+    """Per-account cache of the boost list.
+
+    Stages only change when the account buys a boost or when the daily Reload Fuel Tank stages reset,
+    so the list is dropped after a purchase, on a new UTC day or after BOOST_CACHE_TTL seconds.
+    """
+
+    __slots__ = ('boosts', 'fetched_at', 'day')
+
+    def __init__(self):
+        self.boosts: list[Boost] | None = None
+        self.fetched_at = 0.0
+        self.day = 0
+
+    def is_valid(self) -> bool:
+        return (self.boosts is not None
+                and time() - self.fetched_at < settings.BOOST_CACHE_TTL
+                and self.day == datetime.now(timezone.utc).toordinal())
+
+    def update(self, boosts: list[Boost]) -> None:
+        self.boosts = boosts
+        self.fetched_at = time()
+        self.day = datetime.now(timezone.utc).toordinal()
+
+    def invalidate(self) -> None:
+        self.boosts = None
+
+    def get(self, boost_id: int) -> Boost | None:
+        return next((boost for boost in self.boosts or () if boost.id == boost_id), None)
+
+
+class BoostPlanner:
+    """Chooses the Fuel Tank, Turbo Charger and Reload Fuel Tank purchases that earn the most points per point spent.
+
+    Chances come back one per refresh interval, the longest `secondToRefresh` seen so far, and the bot empties
+    the tank about once per SLEEP_TIME, so an hour has the fewer of `3600 / interval` and `capacity` plays per
+    visit. Half of the plays are won for `base_point * multiplier`, both as the last assess reported them.
+    A Fuel Tank stage adds the plays one more chance saves from overflowing the tank, a Turbo Charger stage
+    one multiplier step on every won play, and both are bought if they pay back within BOOST_PAYBACK_HOURS.
+    A Reload Fuel Tank is a one-off refill, it is only considered with an empty tank and bought if the refilled
+    plays earn more than it costs. Nothing is planned before an assess reported the base points.
+    """
+
+    win_rate = 0.5
+
+    def plays_per_hour(self, capacity: int, refresh_interval: int) -> float:
+        per_visit = capacity * 3600 / (sum(settings.SLEEP_TIME) / 2)
+        return min(3600 / refresh_interval, per_visit) if refresh_interval else per_visit
+
+    def expected_value(self, boost: Boost, capacity: int, chances: int, refresh_interval: int, base_point: int,
+                       multiplier: int) -> float:
+        """Points the boost earns within BOOST_PAYBACK_HOURS, or once for a refill."""
+        point = self.win_rate * base_point
+        plays = self.plays_per_hour(capacity=capacity, refresh_interval=refresh_interval)
+        if boost.id == FUEL_TANK:
+            extra = self.plays_per_hour(capacity=capacity + 1, refresh_interval=refresh_interval) - plays
+            return extra * point * multiplier * settings.BOOST_PAYBACK_HOURS
+        if boost.id == TURBO_CHARGER:
+            return plays * point * settings.BOOST_PAYBACK_HOURS
+        if boost.id == RELOAD_FUEL_TANK and chances == 0:
+            return capacity * point * multiplier
+        return 0.0
+
+    def plan(self, boosts: list[Boost], balance: int, capacity: int, chances: int, refresh_interval: int,
+             base_point: int, multiplier: int) -> list[Boost]:
+        """Returns the boosts to buy now, most points per point spent first."""
+        if not base_point:
+            return []
+
+        candidates = []
+        for boost in boosts:
+            if not is_enabled(boost) or boost.cur_stage >= boost.total_stage:
+                continue
+
+            value = self.expected_value(boost=boost, capacity=capacity, chances=chances,
+                                        refresh_interval=refresh_interval, base_point=base_point,
+                                        multiplier=multiplier)
+            if value <= boost.point_cost:
+                continue
+            candidates.append((value / max(boost.point_cost, 1), boost))
+
+        purchases = []
+        for _, boost in sorted(candidates, key=lambda candidate: candidate[0], reverse=True):
+            if boost.point_cost < balance:
+                purchases.append(boost)
+                balance -= boost.point_cost
+
+        return purchases
@@ -0,0 +1,159 @@
+import asyncio
+import gzip
+import json
+import os
+from collections import defaultdict, deque
+from time import time
+from urllib.parse import urlsplit
+
+import aiohttp
+from multidict import CIMultiDict, CIMultiDictProxy
+from yarl import URL
+
+
+class CassetteExhausted(BaseException):
+    """The replayed session has no recorded response left for the request.
+
+    Not an `Exception`, so the end of a cassette is neither retried nor counted by the circuit breakers.
+    """
+
+
+class CassetteRecorder:
+    """Appends the OKX exchanges and init data of one session to `<directory>/<session>.jsonl.gz`.
+
+    Every line is one JSON record with its wall-clock `ts`: `http` records carry the method, endpoint, status,
+    latency and raw body (status 0 stands for a connection error), `init` records the init data a token refresh
+    produced. Cassettes hold live init data, so treat them like session files.
+    """
+
+    def __init__(self, directory: str, session_name: str):
+        os.makedirs(directory, exist_ok=True)
+        self._file = gzip.open(os.path.join(directory, f'{session_name}.jsonl.gz'), 'at', encoding='utf-8')
+
+    def _write(self, record: dict) -> None:
+        self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+    def http(self, method: str, path: str, status: int, latency: float, body: bytes = b'',
+             retry_after: str = '') -> None:
+        record = {'kind': 'http', 'ts': time(), 'method': method, 'path': path, 'status': status,
+                  'latency': round(latency, 6), 'body': body.decode('utf-8', errors='replace')}
+        if retry_after:
+            record['retry_after'] = retry_after
+        self._write(record=record)
+
+    def init_data(self, init_data: str, user_id: str, first_name: str, last_name: str, auth_date: int) -> None:
+        self._write(record={'kind': 'init', 'ts': time(), 'init_data': init_data, 'user_id': user_id,
+                            'first_name': first_name, 'last_name': last_name, 'auth_date': auth_date})
+
+    def close(self) -> None:
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+class Cassette:
+    """Recorded exchanges of one session, queued per endpoint in the order they happened."""
+
+    def __init__(self, path: str):
+        self.session_name = os.path.basename(path)[:-len('.jsonl.gz')]
+        self.http: dict[tuple[str, str], deque[dict]] = defaultdict(deque)
+        self.init: deque[dict] = deque()
+        self.requests = 0
+        with gzip.open(path, 'rt', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A crash can leave the last line of the last gzip member cut off
+                    continue
+                if record['kind'] == 'http':
+                    self.http[(record['method'], record['path'])].append(record)
+                    self.requests += 1
+                elif record['kind'] == 'init':
+                    self.init.append(record)
+
+    @property
+    def exhausted(self) -> bool:
+        return not any(self.http.values())
+
+    def next_http(self, method: str, path: str) -> dict:
+        queue = self.http.get((method, path))
+        if not queue:
+            raise CassetteExhausted(f"{self.session_name} | No recorded {method} {path} left")
+        return queue.popleft()
+
+    def next_init(self) -> dict:
+        if not self.init:
+            raise CassetteExhausted(f"{self.session_name} | No recorded init data left")
+        return self.init.popleft()
+
+
+class ReplayResponse:
+    __slots__ = ('method', 'url', 'status', 'headers', '_body')
+
+    def __init__(self, method: str, url: str, status: int, body: bytes, headers: dict):
+        self.method = method
+        self.url = url
+        self.status = status
+        self.headers = CIMultiDictProxy(CIMultiDict(headers))
+        self._body = body
+
+    async def read(self) -> bytes:
+        return self._body
+
+    def raise_for_status(self) -> None:
+        if self.status >= 400:
+            url = URL(self.url)
+            request_info = aiohttp.RequestInfo(url=url, method=self.method, headers=CIMultiDictProxy(CIMultiDict()),
+                                               real_url=url)
+            raise aiohttp.ClientResponseError(request_info=request_info, history=(), status=self.status,
+                                              message='Replayed error', headers=self.headers)
+
+    async def __aenter__(self) -> 'ReplayResponse':
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        return None
+
+
+class ReplayClient:
+    """Stands in for the HTTP session of `RacerClient` and answers from a cassette.
+
+    Responses come back after their recorded latency divided by `speed`, requests are matched to the recordings
+    by method and endpoint in order, so the bot's own decisions only have to follow the recorded run.
+    """
+
+    def __init__(self, cassette: Cassette, speed: float = 1.0):
+        self.cassette = cassette
+        self.speed = speed
+        self.headers: dict[str, str] = {}
+        self.closed = False
+
+    def request(self, method: str, url: str, **_) -> '_ReplayRequest':
+        return _ReplayRequest(client=self, method=method, url=url)
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+class _ReplayRequest:
+    __slots__ = ('client', 'method', 'url')
+
+    def __init__(self, client: ReplayClient, method: str, url: str):
+        self.client = client
+        self.method = method
+        self.url = url
+
+    async def __aenter__(self) -> ReplayResponse:
+        path = urlsplit(self.url).path.rsplit('/', 1)[-1]
+        record = self.client.cassette.next_http(method=self.method, path=path)
+        await asyncio.sleep(delay=record['latency'] / self.client.speed)
+        if not record['status']:
+            raise aiohttp.ClientConnectionError(f"Replayed connection error on {path}")
+
+        headers = {'Retry-After': record['retry_after']} if 'retry_after' in record else {}
+        return ReplayResponse(method=self.method, url=self.url, status=record['status'],
+                              body=record['body'].encode(), headers=headers)
+
+    async def __aexit__(self, *_) -> None:
+        return None
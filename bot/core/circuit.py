@@ -0,0 +1,105 @@
+from random import uniform
+from time import monotonic
+
+from bot.config import settings
+from bot.exceptions import CircuitOpen
+from bot.utils import logger
+from bot.utils.metrics import metrics
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class Circuit:
+    """Breaker state of one endpoint."""
+
+    __slots__ = ('endpoint', 'state', 'failures', 'opened_at', 'cooldown', 'probes', 'probed_at')
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.cooldown = 0.0
+        self.probes = 0
+        self.probed_at = 0.0
+
+    def retry_in(self) -> float:
+        return max(0.0, self.opened_at + self.cooldown - monotonic())
+
+
+class CircuitBreaker:
+    """Fleet-wide circuit breakers for the OKX endpoints.
+
+    An endpoint opens after CIRCUIT_FAILURES consecutive 5xx responses. Connection errors of the Racer endpoints are
+    left to the proxy handling of each account, so a few accounts on a dead proxy cannot open a circuit for the
+    fleet. While it is open every request fails fast with `CircuitOpen`, so accounts park instead of probing on
+    their own. Once the cooldown is over, CIRCUIT_PROBES requests at a time are let through: a success closes the
+    circuit, a failure opens it again for twice as long, up to the upper CIRCUIT_COOLDOWN bound.
+    """
+
+    def __init__(self):
+        self._circuits: dict[str, Circuit] = {}
+
+    def _get(self, endpoint: str) -> Circuit:
+        circuit = self._circuits.get(endpoint)
+        if circuit is None:
+            circuit = self._circuits[endpoint] = Circuit(endpoint=endpoint)
+        return circuit
+
+    def _set_state(self, circuit: Circuit, state: str) -> None:
+        if circuit.state != state:
+            metrics.inc('circuit_transitions_total', endpoint=circuit.endpoint, state=state)
+        circuit.state = state
+
+    def check(self, endpoint: str) -> None:
+        """Raises `CircuitOpen` unless a request to the endpoint may go out now."""
+        circuit = self._get(endpoint=endpoint)
+        if circuit.state == CLOSED:
+            return
+
+        now = monotonic()
+        if circuit.state == OPEN and circuit.retry_in() == 0:
+            self._set_state(circuit=circuit, state=HALF_OPEN)
+            circuit.probes = 0
+        elif circuit.state == HALF_OPEN and now - circuit.probed_at >= circuit.cooldown:
+            # The probes never reported back (cancelled), let new ones through
+            circuit.probes = 0
+        if circuit.state == HALF_OPEN and circuit.probes < settings.CIRCUIT_PROBES:
+            circuit.probes += 1
+            circuit.probed_at = now
+            return
+
+        # Spread the parked accounts over the cooldown, so the recovery is not met by all of them at once
+        retry_in = circuit.retry_in() or circuit.cooldown
+        raise CircuitOpen(endpoint=endpoint, retry_in=retry_in + uniform(0, circuit.cooldown / 2))
+
+    def record(self, endpoint: str, ok: bool) -> None:
+        circuit = self._get(endpoint=endpoint)
+        if ok:
+            if circuit.state != CLOSED:
+                logger.info(f"OKX <c>{endpoint}</c> recovered | Circuit closed")
+            self._set_state(circuit=circuit, state=CLOSED)
+            circuit.failures = 0
+            circuit.cooldown = 0.0
+            return
+
+        circuit.failures += 1
+        if circuit.state == HALF_OPEN:
+            self._open(circuit=circuit, cooldown=min(circuit.cooldown * 2, settings.CIRCUIT_COOLDOWN[1]))
+        elif circuit.state == CLOSED and circuit.failures >= settings.CIRCUIT_FAILURES:
+            self._open(circuit=circuit, cooldown=settings.CIRCUIT_COOLDOWN[0])
+
+    def _open(self, circuit: Circuit, cooldown: float) -> None:
+        self._set_state(circuit=circuit, state=OPEN)
+        circuit.opened_at = monotonic()
+        circuit.cooldown = cooldown
+        logger.warning(f"OKX <c>{circuit.endpoint}</c> failed {circuit.failures} times in a row | "
+                       f"Circuit open for <y>{cooldown:.0f}</y> seconds")
+
+    def state(self, endpoint: str) -> str:
+        return self._get(endpoint=endpoint).state
+
+
+circuit_breaker = CircuitBreaker()
@@ -0,0 +1,39 @@
+import asyncio
+
+import aiohttp
+from aiohttp_proxy import ProxyConnector
+
+from bot.config import settings
+
+
+class ConnectorPool:
+    """Keep-alive connectors shared by every account that goes through the same proxy.
+
+    Sessions built on top of a pooled connector must pass `connector_owner=False`, so closing
+    an account's session keeps its own cookies and headers private but leaves the pool open.
+    """
+
+    def __init__(self):
+        self._connectors: dict[str | None, aiohttp.TCPConnector] = {}
+
+    def get(self, proxy: str | None) -> aiohttp.TCPConnector:
+        connector = self._connectors.get(proxy)
+        if connector is None or connector.closed:
+            options = dict(
+                limit=settings.HTTP_POOL_LIMIT,
+                limit_per_host=settings.HTTP_LIMIT_PER_HOST,
+                ttl_dns_cache=settings.DNS_CACHE_TTL,
+                keepalive_timeout=settings.HTTP_KEEPALIVE_TIMEOUT,
+            )
+            connector = ProxyConnector.from_url(proxy, **options) if proxy else aiohttp.TCPConnector(**options)
+            self._connectors[proxy] = connector
+
+        return connector
+
+    async def close(self) -> None:
+        connectors = list(self._connectors.values())
+        self._connectors.clear()
+        await asyncio.gather(*(connector.close() for connector in connectors), return_exceptions=True)
+
+
+connector_pool = ConnectorPool()
@@ -1,4 +1,7 @@
-headers = {
+from types import MappingProxyType
+
+# Shared by every session, each account adds its own User-Agent on top
+headers = MappingProxyType({
     'Accept': 'application/json',
     'Accept-Language': 'en-US,en;q=0.9',
     'Content-Type': 'application/json',
@@ -16,4 +19,4 @@ headers = {
     "X-Locale": "en_US",
     "X-Utc": "7",
     "X-Zkdex-Env": "0"
-}
\ No newline at end of file
+})
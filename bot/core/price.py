@@ -0,0 +1,168 @@
+import asyncio
+import json
+import os
+from collections import deque
+from random import uniform
+from time import time
+from typing import TYPE_CHECKING
+
+import aiohttp
+
+from bot.config import settings
+from bot.exceptions import CircuitOpen
+from bot.utils import logger
+from bot.utils.metrics import metrics
+from .circuit import circuit_breaker
+from .headers import headers
+from .ratelimit import rate_limiter
+
+if TYPE_CHECKING:
+    import numpy as np
+
+    from .ticks import TickRecorder
+
+# Ticker polls the newest tick may be behind before the feed counts as stale
+STALE_POLLS = 5
+
+
+class PriceFeed:
+    """Process-wide BTC-USDT ticker shared by every Tapper.
+
+    A single background task keeps a ring buffer of recent (timestamp, price) ticks,
+    either by polling the REST ticker or by listening to the public tickers channel.
+    """
+
+    def __init__(self, inst_id: str = 'BTC-USDT', size: int = 600):
+        self.inst_id = inst_id
+        self.ticks: deque[tuple[float, float]] = deque(maxlen=size)
+        self._task: asyncio.Task | None = None
+        self.received_at = 0.0
+        self.recorder: 'TickRecorder | None' = None
+
+    def ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            if settings.TICK_RECORDER and self.recorder is None:
+                from .ticks import TickRecorder
+                self.recorder = TickRecorder(directory=os.path.join(settings.DATA_DIR, 'ticks'), inst_id=self.inst_id)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
+
+    def last(self) -> float | None:
+        return self.ticks[-1][1] if self.ticks else None
+
+    def price_at(self, ts: float) -> float | None:
+        """Returns the last known price at or before `ts`."""
+        for tick_ts, price in reversed(self.ticks):
+            if tick_ts <= ts:
+                return price
+        return None
+
+    def change(self, seconds: float) -> tuple[float | None, float | None]:
+        """Returns the price `seconds` before the latest tick and the latest price."""
+        if not self.ticks:
+            return None, None
+        latest_ts, latest = self.ticks[-1]
+        return self.price_at(ts=latest_ts - seconds), latest
+
+    def arrays(self) -> 'tuple[np.ndarray, np.ndarray]':
+        """Returns the buffered timestamps and prices as arrays."""
+        import numpy as np
+
+        ticks = np.array(self.ticks, dtype=np.float64).reshape(-1, 2)
+        return ticks[:, 0], ticks[:, 1]
+
+    def history(self) -> float:
+        """Returns how many seconds of ticks the buffer currently covers."""
+        return self.ticks[-1][0] - self.ticks[0][0] if len(self.ticks) > 1 else 0.0
+
+    async def wait_history(self, seconds: float) -> None:
+        """Waits until the buffer covers at least `seconds` of fresh ticks (only happens right after start).
+
+        Raises RuntimeError when the ticker has not answered for STALE_POLLS polls, or the buffer is not filled
+        that long after it should be, so the round fails into the account's backoff instead of predicting
+        from old prices.
+        """
+        self.ensure_started()
+        max_age = STALE_POLLS * settings.PRICE_POLL_INTERVAL
+        deadline = time() + seconds + max_age
+        while self.history() < seconds or time() - self.received_at > max_age:
+            if time() >= deadline:
+                if not self.received_at:
+                    raise RuntimeError("Price feed has no ticks")
+                raise RuntimeError(f"Price feed is stale | Last tick {time() - self.received_at:.0f} seconds ago")
+            await asyncio.sleep(delay=0.5)
+
+    def _push(self, ts: float, price: float) -> None:
+        # The ticker repeats its last tick while the price stands still, that still proves the feed is alive
+        self.received_at = time()
+        if self.ticks and ts <= self.ticks[-1][0]:
+            return
+        self.ticks.append((ts, price))
+        if self.recorder:
+            self.recorder.append(ts=ts, price=price)
+
+    async def _run(self) -> None:
+        errors, last_tick = 0, None
+        async with aiohttp.ClientSession(headers=headers) as http_client:
+            while True:
+                try:
+                    if settings.PRICE_FEED_WS:
+                        await self._listen(http_client=http_client)
+                        await asyncio.sleep(delay=1)
+                    else:
+                        await self._poll(http_client=http_client)
+                except asyncio.CancelledError:
+                    raise
+                except CircuitOpen as error:
+                    await asyncio.sleep(delay=error.retry_in)
+                except Exception as error:
+                    # The backoff starts over once a tick came in since the previous error
+                    tick = self.ticks[-1][0] if self.ticks else None
+                    errors = 1 if tick != last_tick else errors + 1
+                    last_tick = tick
+                    delay = min(60, 2 ** errors) * uniform(0.5, 1)
+                    logger.error(f"Price feed | Unknown error: {error} | Retry in <y>{delay:.0f}</y> seconds")
+                    await asyncio.sleep(delay=delay)
+
+    async def _poll(self, http_client: aiohttp.ClientSession) -> None:
+        url = f'{settings.PRICE_FEED_URL}/api/v5/market/ticker?instId={self.inst_id}'
+        while True:
+            circuit_breaker.check(endpoint='ticker')
+            await rate_limiter.acquire(endpoint='ticker')
+            try:
+                with metrics.timer('okx_request_duration_seconds', endpoint='ticker', proxy='direct'):
+                    response = await http_client.get(url=url)
+                    response_json = await response.json(content_type=None)
+            except Exception:
+                circuit_breaker.record(endpoint='ticker', ok=False)
+                raise
+            circuit_breaker.record(endpoint='ticker', ok=response.status < 500)
+            rate_limiter.report(endpoint='ticker', proxy='direct', status=response.status)
+            metrics.inc('okx_requests_total', endpoint='ticker', status=response.status)
+            if response_json.get('code') == '0':
+                ticker = response_json['data'][0]
+                self._push(ts=int(ticker['ts']) / 1000, price=float(ticker['last']))
+            await asyncio.sleep(delay=settings.PRICE_POLL_INTERVAL)
+
+    async def _listen(self, http_client: aiohttp.ClientSession) -> None:
+        async with http_client.ws_connect(url=settings.PRICE_FEED_WS_URL, heartbeat=20) as ws:
+            await ws.send_json({"op": "subscribe", "args": [{"channel": "tickers", "instId": self.inst_id}]})
+            async for message in ws:
+                if message.type != aiohttp.WSMsgType.TEXT or message.data == 'pong':
+                    continue
+                for ticker in json.loads(message.data).get('data', []):
+                    self._push(ts=int(ticker.get('ts', time() * 1000)) / 1000, price=float(ticker['last']))
+
+
+price_feed = PriceFeed()
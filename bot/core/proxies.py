@@ -0,0 +1,179 @@
+import asyncio
+import heapq
+import json
+import os
+from collections import Counter
+from time import perf_counter, time
+
+import aiohttp
+
+from bot.config import settings
+from bot.utils import logger
+from bot.utils.files import write_json
+from .connectors import connector_pool
+
+
+class ProxyHealth:
+    __slots__ = ('ok', 'latency', 'ip', 'checked_at', 'error')
+
+    def __init__(self, ok: bool = False, latency: float = 0.0, ip: str = '', checked_at: float = 0.0, error: str = ''):
+        self.ok = ok
+        self.latency = latency
+        self.ip = ip
+        self.checked_at = checked_at
+        self.error = error
+
+    def is_fresh(self) -> bool:
+        return time() - self.checked_at < settings.PROXY_CHECK_TTL
+
+
+class ProxyPool:
+    """Process-wide proxy health checks and assignment of accounts to proxies.
+
+    Check results are cached in DATA_DIR/proxies.json for PROXY_CHECK_TTL seconds, so restarts and shard
+    processes reuse them. Accounts keep their previous proxy while it is healthy, otherwise they get the
+    healthy proxy with the lowest latency weighted by the number of accounts already on it.
+    """
+
+    def __init__(self):
+        self.health: dict[str, ProxyHealth] = {}
+        self.load = Counter()
+        self._loaded = False
+        self._checks: dict[str, asyncio.Task] = {}
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(os.path.join(settings.DATA_DIR, 'proxies.json'), encoding='utf-8') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return
+
+        for proxy, health in data.items():
+            self.health[proxy] = ProxyHealth(**health)
+
+    def save(self) -> None:
+        data = {proxy: {key: getattr(health, key) for key in ProxyHealth.__slots__}
+                for proxy, health in self.health.items()}
+        write_json(path=os.path.join(settings.DATA_DIR, 'proxies.json'), data=data)
+
+    async def check(self, proxy: str) -> ProxyHealth:
+        """Checks the proxy, callers that ask while a check is running share its result."""
+        task = self._checks.get(proxy)
+        if task is None:
+            task = self._checks[proxy] = asyncio.create_task(self._check(proxy=proxy))
+            task.add_done_callback(lambda _: self._checks.pop(proxy, None))
+        return await asyncio.shield(task)
+
+    async def _check(self, proxy: str) -> ProxyHealth:
+        started = perf_counter()
+        try:
+            async with aiohttp.ClientSession(connector=connector_pool.get(proxy=proxy), connector_owner=False) as session:
+                async with session.get(url=settings.PROXY_CHECK_URL,
+                                       timeout=aiohttp.ClientTimeout(settings.PROXY_CHECK_TIMEOUT)) as response:
+                    response.raise_for_status()
+                    ip = (await response.json(content_type=None)).get('origin', '')
+            health = ProxyHealth(ok=True, latency=perf_counter() - started, ip=ip, checked_at=time())
+        except Exception as error:
+            health = ProxyHealth(ok=False, checked_at=time(), error=str(error) or type(error).__name__)
+
+        self.health[proxy] = health
+        return health
+
+    async def prepare(self, proxies: list[str]) -> None:
+        """Drops cached results of proxies no longer in use and checks the rest at startup."""
+        self._load()
+        for proxy in set(self.health) - set(proxies):
+            del self.health[proxy]
+
+        started = perf_counter()
+        await self.check_all(proxies=proxies)
+        self.save()
+        healthy = sum(self._is_healthy(proxy) for proxy in set(proxies))
+        logger.info(f"Proxies checked | Healthy: <g>{healthy}</g>/{len(set(proxies))} | "
+                    f"{perf_counter() - started:.1f}s")
+
+    async def check_all(self, proxies: list[str], force: bool = False) -> None:
+        """Checks every proxy without a fresh cached result, at most PROXY_CHECK_CONCURRENCY at once."""
+        self._load()
+        stale = [proxy for proxy in dict.fromkeys(proxies)
+                 if force or proxy not in self.health or not self.health[proxy].is_fresh()]
+        if not stale:
+            return
+
+        semaphore = asyncio.Semaphore(settings.PROXY_CHECK_CONCURRENCY)
+
+        async def check(proxy: str) -> None:
+            async with semaphore:
+                await self.check(proxy=proxy)
+
+        await asyncio.gather(*(check(proxy=proxy) for proxy in stale))
+
+    def _is_healthy(self, proxy: str) -> bool:
+        health = self.health.get(proxy)
+        return health is not None and health.ok
+
+    def _cost(self, proxy: str) -> tuple[float, int]:
+        health = self.health.get(proxy)
+        latency = health.latency if health else 0.0
+        return latency * (self.load[proxy] + 1), self.load[proxy]
+
+    def assign(self, proxies: list[str], previous: list[str | None]) -> list[str | None]:
+        """Returns a proxy for every account, `previous` holds each account's last proxy or None."""
+        if not proxies:
+            return [None] * len(previous)
+
+        assigned: list[str | None] = [proxy if proxy in proxies and self._is_healthy(proxy) else None
+                                      for proxy in previous]
+        for proxy in assigned:
+            if proxy:
+                self.load[proxy] += 1
+
+        healthy = [proxy for proxy in dict.fromkeys(proxies) if self._is_healthy(proxy)]
+        if not healthy:
+            logger.warning(f"None of {len(proxies)} proxies passed the check | Using them anyway")
+            healthy = list(dict.fromkeys(proxies))
+
+        heap = [(self._cost(proxy), proxy) for proxy in healthy]
+        heapq.heapify(heap)
+        for index, proxy in enumerate(assigned):
+            if proxy:
+                continue
+            _, proxy = heapq.heappop(heap)
+            assigned[index] = proxy
+            self.load[proxy] += 1
+            heapq.heappush(heap, (self._cost(proxy), proxy))
+
+        return assigned
+
+    async def reassign(self, proxy: str) -> str:
+        """Re-checks a failing proxy and returns it while it still passes, otherwise the best healthy replacement."""
+        self._load()
+        health = self.health.get(proxy)
+        if health is None or time() - health.checked_at > settings.PROXY_RECHECK_INTERVAL:
+            await self.check(proxy=proxy)
+        if self._is_healthy(proxy):
+            return proxy
+
+        await self.check_all(proxies=list(self.health))
+        healthy = [candidate for candidate in self.health if self._is_healthy(candidate)]
+        if not healthy:
+            return proxy
+
+        replacement = min(healthy, key=self._cost)
+        self.load[proxy] -= 1
+        self.load[replacement] += 1
+        return replacement
+
+    def describe(self, proxy: str) -> str:
+        health = self.health.get(proxy)
+        if health is None:
+            return 'not checked'
+        if not health.ok:
+            return f'failed ({health.error})'
+        return f'{health.ip} | {health.latency * 1000:.0f} ms'
+
+
+proxy_pool = ProxyPool()
@@ -0,0 +1,98 @@
+import asyncio
+from time import monotonic
+
+from bot.config import settings
+
+
+class TokenBucket:
+    """Token bucket whose rate is cut on throttling and recovers additively on success."""
+
+    __slots__ = ('base_rate', 'rate', 'capacity', 'tokens', 'updated', 'paused_until')
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = monotonic()
+        self.paused_until = 0.0
+
+    def reserve(self) -> float:
+        """Takes one token and returns how long the caller has to wait before using it."""
+        now = monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(wait, self.paused_until - now)
+
+    def penalize(self, pause: float = 0.0) -> None:
+        self.rate = max(self.base_rate * settings.RATE_LIMIT_MIN_FACTOR, self.rate / 2)
+        self.paused_until = max(self.paused_until, monotonic() + pause)
+
+    def reward(self) -> None:
+        if self.rate < self.base_rate:
+            self.rate = min(self.base_rate, self.rate + self.base_rate * 0.05)
+
+
+class RateLimiter:
+    """Fleet-wide pacing of OKX requests per endpoint, per proxy and globally, and of Telegram calls."""
+
+    def __init__(self):
+        self._global: TokenBucket | None = None
+        self._telegram: TokenBucket | None = None
+        self._endpoints: dict[str, TokenBucket] = {}
+        self._proxies: dict[str, TokenBucket] = {}
+
+    def _buckets(self, endpoint: str, proxy: str) -> tuple[TokenBucket, TokenBucket, TokenBucket]:
+        if self._global is None:
+            self._global = TokenBucket(rate=settings.RATE_LIMIT_GLOBAL)
+
+        endpoint_bucket = self._endpoints.get(endpoint)
+        if endpoint_bucket is None:
+            endpoint_bucket = self._endpoints[endpoint] = TokenBucket(rate=settings.RATE_LIMIT_ENDPOINT)
+
+        proxy_bucket = self._proxies.get(proxy)
+        if proxy_bucket is None:
+            proxy_bucket = self._proxies[proxy] = TokenBucket(rate=settings.RATE_LIMIT_PROXY)
+
+        return self._global, endpoint_bucket, proxy_bucket
+
+    async def acquire(self, endpoint: str, proxy: str = 'direct') -> None:
+        wait = max(bucket.reserve() for bucket in self._buckets(endpoint=endpoint, proxy=proxy))
+        if wait > 0:
+            await asyncio.sleep(delay=wait)
+
+    def report(self, endpoint: str, proxy: str, status: int | str, retry_after: float = 0.0) -> None:
+        """Tightens the buckets on HTTP 429/5xx and connection errors, relaxes them on success."""
+        global_bucket, endpoint_bucket, proxy_bucket = self._buckets(endpoint=endpoint, proxy=proxy)
+        if status == 429 or (isinstance(status, int) and status >= 500):
+            pause = retry_after or settings.RATE_LIMIT_PAUSE
+            endpoint_bucket.penalize(pause=pause)
+            proxy_bucket.penalize(pause=pause)
+            global_bucket.penalize()
+        elif not isinstance(status, int):
+            proxy_bucket.penalize()
+        else:
+            global_bucket.reward()
+            endpoint_bucket.reward()
+            proxy_bucket.reward()
+
+    async def acquire_telegram(self) -> None:
+        if self._telegram is None:
+            self._telegram = TokenBucket(rate=settings.TELEGRAM_RATE_LIMIT)
+        wait = self._telegram.reserve()
+        if wait > 0:
+            await asyncio.sleep(delay=wait)
+
+    def report_telegram(self, flood_wait: bool) -> None:
+        """Halves the process-wide Telegram rate on FloodWait, the session itself still waits its own FloodWait out."""
+        if self._telegram is None:
+            self._telegram = TokenBucket(rate=settings.TELEGRAM_RATE_LIMIT)
+        if flood_wait:
+            self._telegram.penalize()
+        else:
+            self._telegram.reward()
+
+
+rate_limiter = RateLimiter()
@@ -1,7 +1,6 @@
-from pyrogram import Client
-
 from bot.config import settings
 from bot.utils import logger
+from bot.core.telegram import create_client
 
 
 async def register_sessions() -> None:
@@ -16,12 +15,7 @@ async def register_sessions() -> None:
     if not session_name:
         return None
 
-    session = Client(
-        name=session_name,
-        api_id=API_ID,
-        api_hash=API_HASH,
-        workdir="sessions/"
-    )
+    session = create_client(session_name=session_name)
 
     async with session:
         user_data = await session.get_me()
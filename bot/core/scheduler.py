@@ -0,0 +1,204 @@
+import asyncio
+import heapq
+from itertools import count
+from random import uniform
+from time import time
+
+from bot.config import settings
+from bot.exceptions import InvalidSession
+from bot.utils import logger
+from .state import state_store
+from .tapper import Tapper, Hibernated
+
+
+class TimerWheel:
+    """Hashed timing wheel for hibernated accounts, O(1) to add and to expire per slot.
+
+    Slots are `resolution` seconds wide, an entry more than one lap ahead stays in its slot until its lap comes.
+    """
+
+    def __init__(self, resolution: float, slots: int = 1024):
+        self.resolution = resolution
+        self._slots: list[list[tuple[int, float, Hibernated]]] = [[] for _ in range(slots)]
+        self._cursor = int(time() // resolution)
+        self.size = 0
+
+    def add(self, account: Hibernated, at: float) -> None:
+        tick = max(int(at // self.resolution), self._cursor + 1)
+        self._slots[tick % len(self._slots)].append((tick, at, account))
+        self.size += 1
+
+    def next_due(self) -> float:
+        return (self._cursor + 1) * self.resolution
+
+    def expire(self, now: float) -> list[tuple[float, Hibernated]]:
+        """Advances the wheel to `now` and returns the due entries."""
+        target = int(now // self.resolution)
+        due = []
+        for tick in range(self._cursor + 1, min(target, self._cursor + len(self._slots)) + 1):
+            slot = self._slots[tick % len(self._slots)]
+            if not slot:
+                continue
+            waiting = [entry for entry in slot if entry[0] > target]
+            due.extend((at, account) for entry_tick, at, account in slot if entry_tick <= target)
+            slot[:] = waiting
+        self._cursor = max(self._cursor, target)
+        self.size -= len(due)
+        return due
+
+
+class Scheduler:
+    """Runs accounts from a priority queue keyed by their next wake time, at most `concurrency` at a time.
+
+    A round holds one of the `concurrency` slots only while it works: `Tapper.sleep` hands the slot back for the
+    gameplay pauses, so the slots bound the accounts talking to OKX, not the accounts in the middle of a round.
+    Accounts that sleep for HIBERNATE_AFTER seconds or longer are hibernated: their HTTP session is closed
+    and only a `Hibernated` record waits on a timer wheel, the `Tapper` is rebuilt when the record is due.
+    """
+
+    def __init__(self, concurrency: int, time_scale: float = 1.0):
+        self.concurrency = concurrency
+        self.time_scale = time_scale
+        self._heap: list[tuple[float, int, Tapper | Hibernated]] = []
+        self._wheel = TimerWheel(resolution=settings.HIBERNATE_RESOLUTION * time_scale)
+        self._counter = count()
+        self._slots = asyncio.Semaphore(concurrency)
+        self._changed = asyncio.Event()
+        self._rounds: set[asyncio.Task] = set()
+        self._running: set[Tapper] = set()
+        self._next_start = 0.0
+        self.accounts = 0
+        self.pending = 0
+        self.ticks = 0
+        self.errors = 0
+
+    @property
+    def hibernated(self) -> int:
+        return self._wheel.size + sum(isinstance(account, Hibernated) for _, _, account in self._heap)
+
+    def add(self, account: Tapper | Hibernated, at: float) -> None:
+        self.accounts += 1
+        self._push(account=account, at=at)
+
+    def expect(self, count: int) -> None:
+        """Keeps the scheduler running for `count` accounts that are still to be added, `settle` each of them."""
+        self.pending += count
+
+    def settle(self) -> None:
+        self.pending -= 1
+        self._changed.set()
+
+    def spread(self, accounts: list[Tapper | Hibernated], rate: float, jitter: list[int]) -> None:
+        """Schedules the first wake of each account at `rate` accounts per second plus a random jitter.
+
+        Accounts resumed from the state store with a wake time still ahead keep that time instead. Calls share
+        one pace, accounts spread one at a time queue up behind the ones spread before them.
+        """
+        now = time()
+        start = max(now, self._next_start)
+        due = 0
+        for account in accounts:
+            next_run = state_store.get(session_name=account.session_name).next_run
+            if next_run > now:
+                self.add(account=account, at=next_run)
+            else:
+                self.add(account=account, at=start + due / rate + uniform(jitter[0], jitter[1]))
+                due += 1
+        self._next_start = start + due / rate
+
+    def _push(self, account: Tapper | Hibernated, at: float) -> None:
+        heapq.heappush(self._heap, (at, next(self._counter), account))
+        self._changed.set()
+
+    async def run(self) -> None:
+        try:
+            await self._dispatch()
+        finally:
+            for task in self._rounds:
+                task.cancel()
+            await asyncio.gather(*self._rounds, return_exceptions=True)
+            # Tappers in the middle of a round still hold their HTTP sessions
+            accounts = [account for _, _, account in self._heap] + list(self._running)
+            await asyncio.gather(*(account.close() for account in accounts if isinstance(account, Tapper)),
+                                 return_exceptions=True)
+            self._running.clear()
+
+    async def _dispatch(self) -> None:
+        while self.accounts > 0 or self.pending > 0:
+            self._changed.clear()
+            for at, account in self._wheel.expire(now=time()):
+                heapq.heappush(self._heap, (at, next(self._counter), account))
+
+            wakes = [self._heap[0][0]] if self._heap else []
+            if self._wheel.size:
+                wakes.append(self._wheel.next_due())
+            if not wakes:
+                await self._changed.wait()
+                continue
+
+            delay = min(wakes) - time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            if not self._heap or self._heap[0][0] > time():
+                # A wheel slot is due, it is moved to the heap on the next pass
+                continue
+            await self._slots.acquire()
+            _, _, account = heapq.heappop(self._heap)
+            task = asyncio.create_task(self._round(account=account))
+            self._rounds.add(task)
+            task.add_done_callback(self._rounds.discard)
+
+    async def _round(self, account: Tapper | Hibernated) -> None:
+        """Runs one round of an account on the slot `_dispatch` took for it and schedules the next one."""
+        try:
+            tapper = account.wake() if isinstance(account, Hibernated) else account
+        except Exception as error:
+            self._slots.release()
+            logger.bind(session=account.session_name).error(f"Failed to restore the account: {error}")
+            self.errors += 1
+            self.accounts -= 1
+            self._changed.set()
+            return
+
+        self._running.add(tapper)
+        tapper.slot = self._slots
+        try:
+            delay = await tapper.tick()
+            self.ticks += 1
+        except InvalidSession:
+            tapper.log.error("Invalid Session")
+            self.errors += 1
+            delay = None
+        except Exception as error:
+            tapper.log.error(f"Unknown error in scheduler: {error}")
+            self.errors += 1
+            delay = 60
+        finally:
+            # A round cancelled in `Tapper.sleep` is waiting for a slot and does not hold one
+            if tapper.slot is not None:
+                tapper.slot = None
+                self._slots.release()
+
+        # Not in the `finally`: a tapper whose round was cancelled stays in `_running` so `run` closes it
+        self._running.discard(tapper)
+        if delay is None:
+            await self._drop(tapper=tapper)
+            return
+
+        at = time() + delay * self.time_scale
+        tapper.persist(next_run=at)
+        if settings.HIBERNATE_AFTER and delay >= settings.HIBERNATE_AFTER:
+            self._wheel.add(account=await tapper.hibernate(), at=at)
+            self._changed.set()
+        else:
+            self._push(account=tapper, at=at)
+
+    async def _drop(self, tapper: Tapper) -> None:
+        await tapper.close()
+        self.accounts -= 1
+        self._changed.set()
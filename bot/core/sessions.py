@@ -0,0 +1,206 @@
+import asyncio
+import json
+import os
+import shutil
+from pathlib import Path
+from time import time
+
+from bot.config import settings
+from bot.utils import logger
+from bot.utils.files import write_json
+from bot.core.proxies import proxy_pool
+from bot.core.telegram import telegram_gateway
+
+SESSIONS_DIR = 'sessions'
+QUARANTINE_DIR = os.path.join(SESSIONS_DIR, 'quarantine')
+CHECK_TIMEOUT = 30
+# Seconds between writes of the check results while a check is running
+STATUS_SAVE_INTERVAL = 10
+
+
+class SessionStatus:
+    """On-disk cache of session checks, `<DATA_DIR>/sessions.json` maps a session to its last result.
+
+    A valid result is trusted for SESSION_CHECK_INTERVAL seconds, or until the session file changes. Shard
+    processes share the file, `save` merges the results of this process into what is on disk. Results are
+    written along the way, at most every STATUS_SAVE_INTERVAL seconds, so a restart does not check them again.
+    """
+
+    def __init__(self):
+        self.path = os.path.join(settings.DATA_DIR, 'sessions.json')
+        self.entries = self.load()
+        self.changed: dict[str, dict] = {}
+        self.saved_at = time()
+
+    def load(self) -> dict[str, dict]:
+        try:
+            with open(self.path, encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def is_due(self, session_name: str) -> bool:
+        entry = self.entries.get(session_name)
+        if not entry or not entry['valid']:
+            return True
+        try:
+            modified = os.path.getmtime(os.path.join(SESSIONS_DIR, f'{session_name}.session'))
+        except OSError:
+            return True
+        return entry['checked'] < modified or time() - entry['checked'] >= settings.SESSION_CHECK_INTERVAL
+
+    def set(self, session_name: str, valid: bool, user: str = '', error: str = '') -> None:
+        self.entries[session_name] = self.changed[session_name] = {'valid': valid, 'checked': time(), 'user': user,
+                                                                   'error': error}
+        if time() - self.saved_at >= STATUS_SAVE_INTERVAL:
+            self.save()
+
+    def save(self) -> None:
+        self.saved_at = time()
+        if not self.changed:
+            return
+        entries = self.load()
+        entries.update(self.changed)
+        write_json(path=self.path, data=entries, indent=1)
+        self.changed.clear()
+
+
+def quarantine(session_name: str) -> None:
+    """Moves a dead session out of `sessions/`, so it is no longer scheduled."""
+    os.makedirs(QUARANTINE_DIR, exist_ok=True)
+    for suffix in ('.session', '.session-journal'):
+        path = os.path.join(SESSIONS_DIR, f'{session_name}{suffix}')
+        if os.path.exists(path):
+            shutil.move(path, os.path.join(QUARANTINE_DIR, f'{session_name}{suffix}'))
+
+
+class SessionValidator:
+    """Checks sessions with `get_me` and quarantines the ones Telegram rejects.
+
+    Checks go through `telegram_gateway`, so they share TELEGRAM_MAX_CONNECTIONS and the handshake windows with
+    the token refreshes, and a live session keeps its connection for its first refresh. With `force` the cached
+    results are ignored.
+    """
+
+    def __init__(self, force: bool = False):
+        self.force = force
+        self.status = SessionStatus()
+        self.valid = 0
+        self.dead = 0
+        self.unknown = 0
+
+    def is_due(self, session_name: str) -> bool:
+        return self.force or self.status.is_due(session_name=session_name)
+
+    async def check(self, session_name: str, proxy: str | None) -> tuple[bool | None, str]:
+        """Returns True and the account name for a live session, False and the reason for a dead one, None and
+        the error when the check itself failed (network, proxy, timeout) and says nothing about the session."""
+        from pyrogram.errors import Unauthorized, AuthKeyDuplicated
+
+        try:
+            async with telegram_gateway.session(session_name=session_name, proxy=proxy) as client:
+                if not client.is_connected and not await asyncio.wait_for(client.connect(), timeout=CHECK_TIMEOUT):
+                    await client.disconnect()
+                    return False, 'Not authorized'
+                user = await asyncio.wait_for(client.get_me(), timeout=CHECK_TIMEOUT)
+        except (Unauthorized, AuthKeyDuplicated) as error:
+            return False, type(error).__name__
+        except asyncio.TimeoutError:
+            return None, 'Timeout'
+        except Exception as error:
+            return None, f'{type(error).__name__}: {error}'
+
+        return True, f'@{user.username}' if user.username else f'{user.first_name} {user.last_name or ""}'.strip()
+
+    async def validate(self, session_name: str, proxy: str | None) -> bool:
+        """Checks one session, returns False once it was quarantined. Sessions whose check failed are kept."""
+        valid, detail = await self.check(session_name=session_name, proxy=proxy)
+        if valid is None:
+            self.unknown += 1
+            logger.bind(session=session_name).warning(f"Session check failed: {detail} | Keeping it")
+            return True
+
+        self.status.set(session_name=session_name, valid=valid, user=detail if valid else '',
+                        error='' if valid else detail)
+        if valid:
+            self.valid += 1
+            return True
+
+        self.dead += 1
+        quarantine(session_name=session_name)
+        if proxy:
+            proxy_pool.load[proxy] -= 1
+        logger.bind(session=session_name).error(f"Invalid session: {detail} | Moved to {QUARANTINE_DIR}")
+        return False
+
+    def finish(self) -> None:
+        self.status.save()
+        logger.info(f"Sessions checked | Valid: <g>{self.valid}</g> | Quarantined: <r>{self.dead}</r> | "
+                    f"Check failed: <y>{self.unknown}</y>")
+
+
+async def validate_sessions(session_names: list[str], proxies: list[str | None],
+                            force: bool = False) -> tuple[list[str], list[str | None]]:
+    """Checks the sessions that are due and returns the ones that are left with their proxies."""
+    validator = SessionValidator(force=force)
+    due = [index for index, session_name in enumerate(session_names) if validator.is_due(session_name)]
+    logger.info(f"Checking <m>{len(due)}</m> sessions | {len(session_names) - len(due)} valid from the last check")
+
+    semaphore = asyncio.Semaphore(settings.TELEGRAM_MAX_CONNECTIONS)
+
+    async def validate(index: int) -> bool:
+        async with semaphore:
+            return await validator.validate(session_name=session_names[index], proxy=proxies[index])
+
+    results = await asyncio.gather(*(validate(index=index) for index in due))
+    validator.finish()
+    dead = {index for index, valid in zip(due, results) if not valid}
+    return ([session_name for index, session_name in enumerate(session_names) if index not in dead],
+            [proxy for index, proxy in enumerate(proxies) if index not in dead])
+
+
+async def import_sessions(path: str) -> list[str]:
+    """Writes the string sessions listed in a file to `sessions/` and returns their names.
+
+    Every line holds `name:session_string` or just the string, then the session is named after its user id.
+    Existing session files are never overwritten.
+    """
+    from pyrogram.storage import FileStorage, MemoryStorage
+
+    with open(path, encoding='utf-8-sig') as file:
+        lines = [(number, line.strip()) for number, line in enumerate(file, start=1)
+                 if line.strip() and not line.startswith('#')]
+
+    os.makedirs(SESSIONS_DIR, exist_ok=True)
+    imported = []
+    for number, line in lines:
+        session_name, _, session_string = line.rpartition(':')
+        memory = MemoryStorage(name=session_name or 'import', session_string=session_string)
+        try:
+            await memory.open()
+        except Exception as error:
+            logger.error(f"Line {number} | Not a session string: {error}")
+            continue
+
+        try:
+            session_name = session_name or f'imported_{await memory.user_id()}'
+            if os.path.exists(os.path.join(SESSIONS_DIR, f'{session_name}.session')):
+                logger.warning(f"Line {number} | Session {session_name} already exists | Skipped")
+                continue
+
+            storage = FileStorage(name=session_name, workdir=Path(SESSIONS_DIR))
+            await storage.open()
+            await storage.dc_id(await memory.dc_id())
+            await storage.api_id(await memory.api_id() or settings.API_ID)
+            await storage.test_mode(await memory.test_mode())
+            await storage.auth_key(await memory.auth_key())
+            await storage.user_id(await memory.user_id())
+            await storage.is_bot(await memory.is_bot())
+            await storage.save()
+            await storage.close()
+            imported.append(session_name)
+        finally:
+            await memory.close()
+
+    logger.success(f"Imported <m>{len(imported)}</m> of {len(lines)} sessions from {path}")
+    return imported
@@ -0,0 +1,140 @@
+import asyncio
+import os
+import sqlite3
+from time import time
+
+from bot.config import settings
+from bot.utils import logger
+
+
+SCHEMA = {
+    'session': 'TEXT PRIMARY KEY',
+    'token_created': 'REAL',
+    'token_live': 'INTEGER',
+    'balance': 'INTEGER',
+    'chances': 'INTEGER',
+    'refresh_at': 'REAL',
+    'combo': 'INTEGER',
+    'next_run': 'REAL',
+    'updated': 'REAL',
+    'proxy': "TEXT DEFAULT ''",
+    'user_agent': "TEXT DEFAULT ''",
+    'info_at': 'REAL DEFAULT 0',
+}
+COLUMNS = tuple(SCHEMA)
+
+
+class AccountState:
+    """Runtime state of one account that survives a restart. Times are unix timestamps."""
+
+    __slots__ = COLUMNS
+
+    def __init__(self, session: str, token_created: float = 0.0, token_live: int = 0, balance: int = 0,
+                 chances: int = 0, refresh_at: float = 0.0, combo: int = 0, next_run: float = 0.0,
+                 updated: float = 0.0, proxy: str = '', user_agent: str = '',
+                 info_at: float = 0.0):
+        self.session = session
+        self.token_created = token_created
+        self.token_live = token_live
+        self.balance = balance
+        self.chances = chances
+        self.refresh_at = refresh_at
+        self.combo = combo
+        self.next_run = next_run
+        self.updated = updated
+        self.proxy = proxy
+        self.user_agent = user_agent
+        self.info_at = info_at
+
+    def row(self) -> tuple:
+        return tuple(getattr(self, column) for column in COLUMNS)
+
+
+class StateStore:
+    """Process-wide SQLite store of `AccountState` rows.
+
+    The database runs in WAL mode so shard processes can share it. Saved states are collected in memory
+    and written in one transaction every STATE_FLUSH_INTERVAL seconds and on close.
+    """
+
+    def __init__(self):
+        self._db: sqlite3.Connection | None = None
+        self._states: dict[str, AccountState] | None = None
+        self._dirty: dict[str, tuple] = {}
+        self._task: asyncio.Task | None = None
+        self._flushing: asyncio.Task | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(settings.DATA_DIR, exist_ok=True)
+            self._db = sqlite3.connect(os.path.join(settings.DATA_DIR, 'state.db'), timeout=30,
+                                       check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(f"CREATE TABLE IF NOT EXISTS accounts "
+                             f"({', '.join(f'{column} {kind}' for column, kind in SCHEMA.items())})")
+            existing = {row[1] for row in self._db.execute("PRAGMA table_info(accounts)")}
+            for column, kind in SCHEMA.items():
+                if column not in existing:
+                    self._db.execute(f"ALTER TABLE accounts ADD COLUMN {column} {kind}")
+        return self._db
+
+    def get(self, session_name: str) -> AccountState:
+        if self._states is None:
+            cursor = self._connect().execute(f"SELECT {', '.join(COLUMNS)} FROM accounts")
+            self._states = {row[0]: AccountState(*row) for row in cursor}
+
+        state = self._states.get(session_name)
+        if state is None:
+            state = self._states[session_name] = AccountState(session=session_name)
+        return state
+
+    def save(self, state: AccountState) -> None:
+        state.updated = time()
+        self._dirty[state.session] = state.row()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def _write(self, rows: list[tuple]) -> None:
+        db = self._connect()
+        with db:
+            db.executemany(f"INSERT OR REPLACE INTO accounts ({', '.join(COLUMNS)}) "
+                           f"VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+
+    async def flush(self) -> None:
+        if not self._dirty:
+            return
+
+        rows, self._dirty = list(self._dirty.values()), {}
+        try:
+            await asyncio.to_thread(self._write, rows)
+        except sqlite3.Error as error:
+            logger.error(f"Unable to save account states: {error}")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(delay=settings.STATE_FLUSH_INTERVAL)
+            # A write that is already running in the thread pool is finished by `close`, not abandoned
+            self._flushing = asyncio.create_task(self.flush())
+            await asyncio.shield(self._flushing)
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._flushing:
+            await self._flushing
+            self._flushing = None
+
+        await self.flush()
+        if self._db:
+            self._db.close()
+            self._db = None
+        self._states = None
+
+
+state_store = StateStore()
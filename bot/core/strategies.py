@@ -0,0 +1,85 @@
+from functools import lru_cache
+
+import numpy as np
+
+
+UP = 1
+DOWN = 0
+
+
+def resample(ts: np.ndarray, prices: np.ndarray, step: float = 1.0, start: float | None = None,
+             end: float | None = None) -> np.ndarray:
+    """Returns the last known price at every `step` seconds between `start` and `end`.
+
+    Strategies work on this regular grid, so their window is measured in seconds whatever the tick rate was.
+    """
+    start = ts[0] if start is None else start
+    end = ts[-1] if end is None else end
+    grid = np.arange(end, start - step / 2, -step)[::-1]
+    index = np.searchsorted(ts, grid, side='right') - 1
+    return prices[index[index >= 0]]
+
+
+class Strategy:
+    """Predicts the price direction from the last `window` seconds of a 1-second price grid."""
+
+    name = ''
+
+    def __init__(self, window: int):
+        self.window = window
+
+    def signals(self, prices: np.ndarray) -> np.ndarray:
+        """Returns UP or DOWN for every point of the grid. Points without a full window predict UP."""
+        result = np.full(len(prices), UP, dtype=np.int8)
+        if len(prices) > self.window:
+            result[self.window:] = self._signals(prices=prices - prices[0])
+        return result
+
+    def _signals(self, prices: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def predict(self, ts: np.ndarray, prices: np.ndarray) -> int:
+        grid = resample(ts=ts, prices=prices, start=ts[-1] - self.window)
+        return int(self.signals(prices=grid)[-1])
+
+
+class Momentum(Strategy):
+    """Bets that the move of the last `window` seconds continues."""
+
+    name = 'momentum'
+
+    def _signals(self, prices: np.ndarray) -> np.ndarray:
+        return prices[self.window:] >= prices[:-self.window]
+
+
+class MeanReversion(Strategy):
+    """Bets that the price returns to its mean over the last `window` seconds."""
+
+    name = 'mean_reversion'
+
+    def _signals(self, prices: np.ndarray) -> np.ndarray:
+        sums = np.cumsum(np.concatenate(([0.0], prices)))
+        means = (sums[self.window + 1:] - sums[1:-self.window]) / self.window
+        return prices[self.window:] <= means
+
+
+class MicroTrend(Strategy):
+    """Bets on the sign of the least-squares slope over the last `window` seconds."""
+
+    name = 'micro_trend'
+
+    def _signals(self, prices: np.ndarray) -> np.ndarray:
+        offsets = np.arange(self.window + 1) - self.window / 2
+        slopes = np.convolve(prices, offsets[::-1], mode='valid')
+        return slopes >= 0
+
+
+STRATEGIES = {strategy.name: strategy for strategy in (Momentum, MeanReversion, MicroTrend)}
+
+
+@lru_cache
+def get_strategy(name: str, window: int) -> Strategy:
+    try:
+        return STRATEGIES[name](window=window)
+    except KeyError:
+        raise ValueError(f"Unknown prediction strategy {name!r}, expected one of {', '.join(STRATEGIES)}")
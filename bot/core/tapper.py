@@ -1,376 +1,559 @@
 import asyncio
 from time import time
-from urllib.parse import unquote, quote
+from typing import TYPE_CHECKING
 
 import aiohttp
-from aiocfscrape import CloudflareScraper
-from aiohttp_proxy import ProxyConnector
-from better_proxy import Proxy
-from pyrogram import Client
-from pyrogram.errors import Unauthorized, UserDeactivated, AuthKeyUnregistered, FloodWait
-from pyrogram.raw import functions
-from pyrogram.raw.functions.messages import RequestWebView
 from bot.core.agents import generate_random_user_agent
 from bot.config import settings
 
 from bot.utils import logger
-from bot.exceptions import InvalidSession
+from bot.utils.logger import summary
+from bot.utils.metrics import metrics, proxy_label
+from bot.utils.profiling import traced
+from bot.exceptions import InvalidSession, CircuitOpen
 from .headers import headers
-
-from random import randint, choices
+from .connectors import connector_pool
+from .api import RacerClient, InitData, RacerInfo, Boost, AssessResult, Task
+from .boosts import BoostCatalog, BoostPlanner, RELOAD_FUEL_TANK
+from .cassette import CassetteRecorder
+from .circuit import circuit_breaker
+from .price import price_feed
+from .proxies import proxy_pool
+from .ratelimit import rate_limiter
+from .state import state_store
+from .tasks import TaskLedger
+from .telegram import telegram_gateway
+from .webapp_cache import WebAppCache
+
+from random import randint, choices, uniform
+
+if TYPE_CHECKING:
+    from pyrogram import Client
+    from pyrogram.raw.types import InputPeerUser
 
 
 class Tapper:
-    def __init__(self, tg_client: Client):
-        self.tg_client = tg_client
-        self.session_name = tg_client.name
+    __slots__ = ('session_name', 'log', 'tg_client', 'proxy', 'first_name', 'last_name', 'user_id', 'webapp',
+                 'http_client', 'api', 'access_token_created_time', 'token_live_time', 'failures', 'task_ledger',
+                 'boost_catalog', 'max_chances', 'refresh_interval', 'base_point', 'multiplier', 'state', 'slot')
+
+    time_scale = 1.0
+    boost_planner = BoostPlanner()
+
+    def __init__(self, session_name: str, proxy: str | None = None):
+        self.session_name = session_name
+        self.log = logger.bind(session=session_name)
+        self.tg_client: 'Client | None' = None
+        self.proxy = proxy
         self.first_name = ''
         self.last_name = ''
         self.user_id = ''
+        self.webapp = WebAppCache(session_name=self.session_name)
+        self.http_client: aiohttp.ClientSession | None = None
+        self.api: RacerClient | None = None
+        self.access_token_created_time = 0
+        self.token_live_time = randint(3500, 3600)
+        self.failures = 0
+        self.task_ledger = TaskLedger(session_name=self.session_name)
+        self.boost_catalog = BoostCatalog()
+        self.max_chances = 0
+        self.refresh_interval = 0
+        self.base_point = 0
+        self.multiplier = 1
+        # Scheduler slot the round holds while it works, see `sleep`
+        self.slot: asyncio.Semaphore | None = None
+
+        self.state = state_store.get(session_name=self.session_name)
+        if self.state.token_created and self.webapp.init_data:
+            self.access_token_created_time = self.state.token_created
+            self.token_live_time = self.state.token_live
+            self.user_id = self.webapp.user_id
+            self.first_name = self.webapp.first_name
+            self.last_name = self.webapp.last_name
+
+    async def sleep(self, delay: float) -> None:
+        """Sleeps without holding the scheduler slot, so other accounts can work in the meantime.
+
+        Tasks run concurrently within a round, only the first of them to sleep hands the slot back.
+        """
+        slot, self.slot = self.slot, None
+        if slot is not None:
+            slot.release()
+        try:
+            await asyncio.sleep(delay=delay * self.time_scale)
+        finally:
+            if slot is not None:
+                await slot.acquire()
+                self.slot = slot
 
+    @traced
     async def get_tg_web_data(self, proxy: str | None) -> str:
-        if proxy:
-            proxy = Proxy.from_str(proxy)
-            proxy_dict = dict(
-                scheme=proxy.protocol,
-                hostname=proxy.host,
-                port=proxy.port,
-                username=proxy.login,
-                password=proxy.password
-            )
-        else:
-            proxy_dict = None
+        if self.webapp.is_fresh():
+            self.user_id = self.webapp.user_id
+            self.first_name = self.webapp.first_name
+            self.last_name = self.webapp.last_name
+            return self.webapp.init_data
 
-        self.tg_client.proxy = proxy_dict
+        from pyrogram.errors import Unauthorized, UserDeactivated, AuthKeyUnregistered, FloodWait
+        from pyrogram.raw.functions.messages import RequestWebView
 
         try:
-            if not self.tg_client.is_connected:
-                try:
-                    await self.tg_client.connect()
-                    start_command_found = False
-                    async for message in self.tg_client.get_chat_history('OKX_official_bot'):
-                        if (message.text and message.text.startswith('/start')) or (message.caption and message.caption.startswith('/start')):
-                            start_command_found = True
-                            break
-
-                    if not start_command_found:
-                        peer = await self.tg_client.resolve_peer('OKX_official_bot')
-                        link = choices([settings.REF_ID, get_link_code()], weights=[40, 60], k=1)[0]
-                        await self.tg_client.invoke(
-                            functions.messages.StartBot(
-                                bot=peer,
-                                peer=peer,
-                                start_param='linkCode_' + link,
-                                random_id=randint(1, 9999999),
-                            )
-                        )
-
-                except (Unauthorized, UserDeactivated, AuthKeyUnregistered):
-                    raise InvalidSession(self.session_name)
-
-            while True:
-                try:
-                    peer = await self.tg_client.resolve_peer('OKX_official_bot')
-                    break
-                except FloodWait as fl:
-                    fls = fl.value
-
-                    logger.warning(f"<light-yellow>{self.session_name}</light-yellow> | FloodWait {fl}")
-                    logger.info(f"<light-yellow>{self.session_name}</light-yellow> | Sleep {fls}s")
-
-                    await asyncio.sleep(fls + 3)
+            await rate_limiter.acquire_telegram()
+            async with telegram_gateway.session(session_name=self.session_name, proxy=proxy) as tg_client:
+                self.tg_client = tg_client
+                if not tg_client.is_connected:
+                    try:
+                        with metrics.timer('telegram_call_duration_seconds', method='connect'):
+                            await tg_client.connect()
+                        if not self.webapp.start_found:
+                            await self.start_bot()
+
+                    except (Unauthorized, UserDeactivated, AuthKeyUnregistered):
+                        raise InvalidSession(self.session_name)
+
+                peer = await self.resolve_bot_peer()
+                with metrics.timer('telegram_call_duration_seconds', method='request_web_view'):
+                    web_view = await tg_client.invoke(RequestWebView(
+                        peer=peer,
+                        bot=peer,
+                        platform='android',
+                        from_bot_menu=False,
+                        url="https://www.okx.com/",
+                    ))
+
+            init_data = InitData.from_url(url=web_view.url)
+            self.user_id = init_data.user_id
+            self.first_name = init_data.first_name
+            self.last_name = init_data.last_name
+
+            self.webapp.init_data = init_data.to_query()
+            self.webapp.auth_date = init_data.auth_date
+            self.webapp.user_id = self.user_id
+            self.webapp.first_name = self.first_name
+            self.webapp.last_name = self.last_name
+            self.webapp.save()
+            rate_limiter.report_telegram(flood_wait=False)
+            return self.webapp.init_data
 
-            web_view = await self.tg_client.invoke(RequestWebView(
-                peer=peer,
-                bot=peer,
-                platform='android',
-                from_bot_menu=False,
-                url="https://www.okx.com/",
-            ))
+        except InvalidSession as error:
+            raise error
 
-            auth_url = web_view.url
-            tg_web_data = unquote(
-                string=unquote(string=auth_url.split('tgWebAppData=')[1].split('&tgWebAppVersion')[0]))
-            query_id = tg_web_data.split('query_id=')[1].split('&user=')[0]
-            user = quote(tg_web_data.split("&user=")[1].split('&auth_date=')[0])
-            auth_date = tg_web_data.split('&auth_date=')[1].split('&hash=')[0]
-            hash_ = tg_web_data.split('&hash=')[1]
+        except Exception as error:
+            metrics.inc('telegram_errors_total', error=type(error).__name__)
+            if isinstance(error, FloodWait):
+                metrics.inc('telegram_flood_waits_total')
+                rate_limiter.report_telegram(flood_wait=True)
+            self.log.error(f"Unknown error during Authorization: {error}")
+            self.webapp.peer = None
+
+        finally:
+            # The gateway owns the connection, accounts hold no Pyrogram state between refreshes
+            self.tg_client = None
+
+    async def start_bot(self) -> None:
+        """Sends /start to the OKX bot once per session lifetime, the result is kept in the WebApp cache."""
+        from pyrogram.raw import functions
+
+        with metrics.timer('telegram_call_duration_seconds', method='get_chat_history'):
+            start_command_found = False
+            async for message in self.tg_client.get_chat_history('OKX_official_bot'):
+                if (message.text and message.text.startswith('/start')) or (message.caption and message.caption.startswith('/start')):
+                    start_command_found = True
+                    break
 
-            self.user_id = tg_web_data.split('"id":')[1].split(',"first_name"')[0]
-            self.first_name = tg_web_data.split('"first_name":"')[1].split('","last_name"')[0]
-            self.last_name = tg_web_data.split('"last_name":"')[1].split('","username"')[0]
+        if not start_command_found:
+            peer = await self.resolve_bot_peer()
+            link = choices([settings.REF_ID, get_link_code()], weights=[40, 60], k=1)[0]
+            with metrics.timer('telegram_call_duration_seconds', method='start_bot'):
+                await self.tg_client.invoke(
+                    functions.messages.StartBot(
+                        bot=peer,
+                        peer=peer,
+                        start_param='linkCode_' + link,
+                        random_id=randint(1, 9999999),
+                    )
+                )
+
+        self.webapp.start_found = True
+        self.webapp.save()
+
+    async def resolve_bot_peer(self) -> 'InputPeerUser':
+        from pyrogram.errors import FloodWait
+        from pyrogram.raw.types import InputPeerUser
+
+        if self.webapp.peer:
+            return InputPeerUser(**self.webapp.peer)
 
-            if self.tg_client.is_connected:
-                await self.tg_client.disconnect()
+        while True:
+            try:
+                with metrics.timer('telegram_call_duration_seconds', method='resolve_peer'):
+                    peer = await self.tg_client.resolve_peer('OKX_official_bot')
+                break
+            except FloodWait as fl:
+                fls = fl.value
+                metrics.inc('telegram_flood_waits_total')
+                rate_limiter.report_telegram(flood_wait=True)
 
-            return f"query_id={query_id}&user={user}&auth_date={auth_date}&hash={hash_}"
+                self.log.warning(f"FloodWait {fl}")
+                self.log.info(f"Sleep {fls}s")
 
-        except InvalidSession as error:
-            raise error
+                await self.sleep(delay=fls + 3)
 
-        except Exception as error:
-            logger.error(f"<light-yellow>{self.session_name}</light-yellow> | Unknown error during Authorization: "
-                         f"{error}")
-            await asyncio.sleep(delay=3)
+        self.webapp.peer = dict(user_id=peer.user_id, access_hash=peer.access_hash)
+        self.webapp.save()
+        return peer
 
-    async def get_info_data(self, http_client: aiohttp.ClientSession):
+    @traced
+    async def get_info_data(self) -> RacerInfo | None:
         try:
-            json_data = {
-                "extUserId": self.user_id,
-                "extUserName": self.first_name + ' ' + self.last_name,
-                "gameId": 1,
-                "linkCode": get_link_code()
-            }
-            response = await http_client.post(f'https://www.okx.com/priapi/v1/affiliate/game/racer/info?'
-                                              f't={int(time() * 1000)}', json=json_data)
-            response.raise_for_status()
-
-            response_json = await response.json()
-            return response_json
-
-        except Exception as error:
-            logger.error(f"{self.session_name} | Unknown error when getting user data: {error}")
-            await asyncio.sleep(delay=randint(3, 7))
+            return await self.api.info()
 
-    async def check_proxy(self, http_client: aiohttp.ClientSession, proxy: Proxy) -> None:
-        try:
-            response = await http_client.get(url='https://httpbin.org/ip', timeout=aiohttp.ClientTimeout(5))
-            ip = (await response.json()).get('origin')
-            logger.info(f"{self.session_name} | Proxy IP: {ip}")
         except Exception as error:
-            logger.error(f"{self.session_name} | Proxy: {proxy} | Error: {error}")
+            self.log.error(f"Unknown error when getting user data: {error}")
+
+    def info_is_stale(self) -> bool:
+        """The snapshot is rebuilt from racer/info when it is older than INFO_REFRESH_INTERVAL or when
+        the account is out of chances and the time of the next one is unknown."""
+        if time() - self.state.info_at >= settings.INFO_REFRESH_INTERVAL * self.time_scale:
+            return True
+        return self.state.chances == 0 and not self.state.refresh_at
+
+    @traced
+    async def refresh_info(self) -> None:
+        user_info = await self.get_info_data()
+        if user_info is None:
+            raise RuntimeError("Account info is unavailable")
+
+        refresh_time = user_info.second_to_refresh
+        self.max_chances = max(self.max_chances, user_info.num_chances)
+        # The timer of a chance that just went is the closest thing to the refresh interval OKX reports
+        self.refresh_interval = max(self.refresh_interval, refresh_time)
+        self.state.balance = user_info.balance_points
+        self.state.chances = user_info.num_chances
+        # One second of margin, secondToRefresh is rounded down
+        self.state.refresh_at = time() + (refresh_time + 1) * self.time_scale if refresh_time else 0.0
+        self.state.info_at = time()
+
+    @traced
+    async def processing_tasks(self):
+        if not self.task_ledger.needs_refresh():
+            return
 
-    async def processing_tasks(self, http_client: aiohttp.ClientSession):
         try:
-            response = await http_client.get(url=f'https://www.okx.com/priapi/v1/affiliate/game/racer/tasks?extUserId='
-                                                 f'{self.user_id}&t={int(time() * 1000)}')
-            response.raise_for_status()
-            response_json = await response.json()
-
-            tasks = response_json['data']
-            for task in tasks:
-                if task['state'] == 0 and task['id'] != 5 and task['id'] != 9:
-                    logger.info(f"{self.session_name} | Performing task <lc>{task['context']['name']}</lc>...")
-                    response_data = await self.perform_task(http_client=http_client, task_id=task['id'])
-                    if response_data:
-                        logger.success(f"{self.session_name} | Task <lc>{task['context']['name']}</lc> completed! | "
-                                       f"Reward: <e>+{task['points']}</e> points")
-
-                    await asyncio.sleep(delay=randint(5, 10))
+            tasks = await self.api.tasks()
+            pending = self.task_ledger.pending(tasks=tasks)
+            if pending:
+                semaphore = asyncio.Semaphore(settings.TASK_CONCURRENCY)
+                results = await asyncio.gather(*(self.run_task(task=task, semaphore=semaphore) for task in pending),
+                                               return_exceptions=True)
+                # Let every task finish before a CircuitOpen or InvalidSession ends the round and closes the client
+                for result in results:
+                    if isinstance(result, BaseException):
+                        raise result
 
         except Exception as error:
-            logger.error(f"{self.session_name} | Unknown error when completing tasks: {error}")
-            await asyncio.sleep(delay=3)
+            self.log.error(f"Unknown error when completing tasks: {error}")
+
+        finally:
+            self.task_ledger.save()
+
+    @traced
+    async def run_task(self, task: Task, semaphore: asyncio.Semaphore):
+        async with semaphore:
+            self.log.info(f"Performing task <lc>{task.name}</lc>...")
+            response_data = await self.perform_task(task_id=task.id)
+            if response_data and response_data.get('code') == 0:
+                self.task_ledger.mark_completed(task_id=task.id)
+                self.state.balance += task.points
+                metrics.inc('racer_points_gained_total', task.points, source='task')
+                summary.add(self.session_name, tasks=1, points=task.points)
+                self.log.success(f"Task <lc>{task.name}</lc> completed! | "
+                                 f"Reward: <e>+{task.points}</e> points")
+            else:
+                self.task_ledger.mark_failed(task_id=task.id)
+
+            await self.sleep(delay=uniform(1, 3))
 
-    async def perform_task(self, http_client: aiohttp.ClientSession, task_id: str):
+    async def perform_task(self, task_id: int):
         try:
-            payload = {
-                "extUserId": self.user_id,
-                "id": task_id
-            }
-            response = await http_client.post(url=f'https://www.okx.com/priapi/v1/affiliate/game/racer/task?t='
-                                                  f'{int(time() * 1000)}', json=payload)
-            response.raise_for_status()
-            response_json = await response.json()
-            return response_json
+            return await self.api.perform_task(task_id=task_id)
 
         except Exception as e:
-            logger.error(f"{self.session_name} | Unknown error while check in task {task_id} | Error: {e}")
+            self.log.error(f"Unknown error while check in task {task_id} | Error: {e}")
+
+    @traced
+    async def get_boosts(self) -> list[Boost]:
+        if self.boost_catalog.is_valid():
+            return self.boost_catalog.boosts
 
-    async def get_boosts(self, http_client: aiohttp.ClientSession):
         try:
-            response = await http_client.get(url=f'https://www.okx.com/priapi/v1/affiliate/game/racer/boosts?extUserId='
-                                                 f'{self.user_id}&t={int(time() * 1000)}')
-            response.raise_for_status()
-            response_json = await response.json()
-            return response_json.get('data', [])
+            self.boost_catalog.update(boosts=await self.api.boosts())
+            return self.boost_catalog.boosts
         except Exception as e:
-            logger.error(f"{self.session_name} | Unknown error while getting boosts | Error: {e}")
-
-    def can_buy_boost(self, balance: str, boost: dict) -> bool:
-        match boost['context']['name']:
-            case 'Fuel Tank':
-                if not settings.FUEL_TANK_BOOST:
-                    return False
-            case 'Reload Fuel Tank':
-                if not settings.RELOAD_TANK_BOOST:
-                    return False
-            case 'Turbo Charger':
-                if not settings.TURBO_CHARGER_BOOST:
-                    return False
-            case _:
-                return False
-
-        cost = boost['pointCost']
-        cur_stage = boost['curStage']
-        total_stage = boost['totalStage']
-        return balance > cost and cur_stage < total_stage
-
-    async def buy_boost(self, http_client: aiohttp.ClientSession, boost_id: int, boost_name: str) -> bool:
+            self.log.error(f"Unknown error while getting boosts | Error: {e}")
+            return []
+
+    @traced
+    async def buy_boost(self, boost_id: int, boost_name: str) -> bool:
         try:
-            payload = {
-                "extUserId": self.user_id,
-                "id": boost_id
-            }
-            response = await http_client.post(url=f'https://www.okx.com/priapi/v1/affiliate/game/racer/boost?'
-                                                  f't={int(time() * 1000)}', json=payload)
-            response.raise_for_status()
-            response_json = await response.json()
-            if response_json.get('code') == 0:
-                logger.success(f"{self.session_name} | Successful purchase <lc>{boost_name}</lc>")
+            if await self.api.buy_boost(boost_id=boost_id):
+                self.boost_catalog.invalidate()
+                summary.add(self.session_name, boosts=1)
+                self.log.success(f"Successful purchase <lc>{boost_name}</lc>")
                 return True
 
             return False
 
         except Exception as e:
-            logger.error(f"{self.session_name} | Unknown error while buying boost: {boost_id}| Error: {e}")
-
-    async def get_price(self, http_client: aiohttp.ClientSession):
-        try:
-            response = await http_client.get(f'https://www.okx.com/api/v5/market/ticker?instId=BTC-USDT')
-            response_json = await response.json()
-            if response_json.get('code') == '0':
-                price = response_json['data'][0]['last']
-                return float(price)
-            else:
-                await asyncio.sleep(delay=3)
-                return await self.get_price(http_client=http_client)
-        except Exception as error:
-            logger.error(f"{self.session_name} | Unknown error when getting price: {error}")
-            await asyncio.sleep(delay=3)
+            self.log.error(f"Unknown error while buying boost: {boost_id}| Error: {e}")
+
+    async def upgrade(self) -> bool:
+        """Buys the boosts the planner picks, returns True when a Reload Fuel Tank refilled the chances."""
+        boosts = await self.get_boosts()
+        plan = self.boost_planner.plan(boosts=boosts, balance=self.state.balance, capacity=self.max_chances,
+                                       chances=self.state.chances, refresh_interval=self.refresh_interval,
+                                       base_point=self.base_point, multiplier=self.multiplier)
+        reloaded = False
+        for boost in plan:
+            if not await self.buy_boost(boost_id=boost.id, boost_name=boost.name):
+                continue
+            self.state.balance -= boost.point_cost
+            self.log.info(f"<lc>{boost.name}</lc> upgraded to <m>{boost.cur_stage + 1}</m> lvl")
+            if boost.id == RELOAD_FUEL_TANK:
+                self.state.chances = self.max_chances
+                self.state.refresh_at = 0.0
+                reloaded = True
+
+        return reloaded
+
+    @traced
+    async def make_assess(self) -> AssessResult | None:
+        """Plays one chance. Returns None when the init data was rejected, other errors end the round."""
+        if settings.RANDOM_PREDICTION:
+            predict = randint(0, 1)
+            await self.sleep(delay=randint(4, 6))
+        else:
+            from .strategies import get_strategy
+
+            strategy = get_strategy(name=settings.PREDICTION_STRATEGY, window=settings.PREDICTION_WINDOW)
+            await price_feed.wait_history(seconds=strategy.window)
+            predict = strategy.predict(*price_feed.arrays())
+
+        result = await self.api.assess(predict=predict)
+        if result is None:
+            self.log.warning(f"Authorization error | Refreshing token...")
+            return None
+
+        metrics.inc('racer_chances_consumed_total')
+        metrics.inc('racer_assess_total', result='won' if result.won else 'lost')
+        log = self.log.bind(sample='prediction')
+        if result.won:
+            metrics.inc('racer_points_gained_total', result.added_points, source='assess')
+            summary.add(self.session_name, predictions_won=1, points=result.added_points)
+            log.success(f"Successful prediction | Got <y>{result.added_points}</y> points | "
+                        f"Balance: <e>{result.balance_points}</e> | "
+                        f"Chances: <m>{result.num_chance}</m> | "
+                        f"Combo: <m>x{result.cur_combo}</m>")
+        else:
+            summary.add(self.session_name, predictions_lost=1)
+            log.info(f"Wrong prediction | Balance: <e>{result.balance_points}</e> | "
+                     f"Chances: <m>{result.num_chance}</m>")
+
+        return result
+
+    def create_http_client(self) -> aiohttp.ClientSession:
+        from aiocfscrape import CloudflareScraper
+
+        if not self.state.user_agent:
+            self.state.user_agent = generate_random_user_agent(device_type='android', browser_type='chrome')
+        return CloudflareScraper(headers={**headers, 'User-Agent': self.state.user_agent},
+                                 connector=connector_pool.get(proxy=self.proxy), connector_owner=False)
+
+    @traced
+    async def open(self) -> None:
+        self.http_client = self.create_http_client()
+        recorder = None
+        if settings.CASSETTE_DIR:
+            recorder = CassetteRecorder(directory=settings.CASSETTE_DIR, session_name=self.session_name)
+        self.api = RacerClient(http_client=self.http_client, link_code=get_link_code(), base_url=settings.OKX_BASE_URL,
+                               metrics=metrics, limiter=rate_limiter, proxy_label=proxy_label(self.proxy),
+                               breaker=circuit_breaker, retries=settings.OKX_RETRIES, recorder=recorder)
+        self.api.user_id = self.user_id
+        self.api.user_name = f'{self.first_name} {self.last_name}'
+        if self.webapp.init_data:
+            self.http_client.headers["X-Telegram-Init-Data"] = self.webapp.init_data
+
+        if self.proxy:
+            self.log.info(f"Proxy: {proxy_pool.describe(proxy=self.proxy)}")
+
+    async def close(self) -> None:
+        if self.http_client:
+            await self.http_client.close()
+            if self.api.recorder:
+                self.api.recorder.close()
+            self.http_client = None
+            self.api = None
+
+    @traced
+    async def tick(self) -> float:
+        """Runs one farming round and returns the number of seconds until the next useful action."""
+        if self.http_client is None:
+            await self.open()
 
-    async def make_assess(self, http_client: aiohttp.ClientSession):
         try:
-            if settings.RANDOM_PREDICTION:
-                predict = randint(0, 1)
-                await asyncio.sleep(delay=randint(4, 6))
-            else:
-                price = await self.get_price(http_client=http_client)
-                await asyncio.sleep(delay=3)
-                new_price = await self.get_price(http_client=http_client)
-                predict = 0 if price > new_price else 1
-            json_data = {
-                "extUserId": self.user_id,
-                "predict": predict,
-                "gameId": 1
-            }
-
-            response = await http_client.post(f'https://www.okx.com/priapi/v1/affiliate/game/racer/assess?'
-                                              f't={int(time() * 1000)}', json=json_data)
-
-            response_json = await response.json()
-            if response_json.get('code') == 499004:
-                logger.warning(f"{self.session_name} | Authorization error | Refreshing token...")
-                return None
-
-            response.raise_for_status()
-            response_data = response_json['data']
-            if response_data["won"]:
-                added_points = response_data['basePoint'] * response_data['multiplier']
-                logger.success(f"{self.session_name} | Successful prediction | Got <y>{added_points}</y> points | "
-                               f"Balance: <e>{response_data['balancePoints']}</e> | "
-                               f"Chances: <m>{response_data['numChance']}</m> | "
-                               f"Combo: <m>x{response_data['curCombo']}</m>")
-            else:
-                logger.info(
-                    f"{self.session_name} | Wrong prediction | Balance: <e>{response_data['balancePoints']}</e> |"
-                    f" Chances: <m>{response_data['numChance']}</m>")
-
-            return response_data
+            if time() - self.access_token_created_time >= self.token_live_time:
+                tg_web_data = await self.get_tg_web_data(proxy=self.proxy)
+                if tg_web_data is None:
+                    # The error is logged, keep the old header and token time and retry after the backoff
+                    raise RuntimeError("Init data is unavailable")
+                self.http_client.headers["X-Telegram-Init-Data"] = tg_web_data
+                self.api.user_id = self.user_id
+                self.api.user_name = f'{self.first_name} {self.last_name}'
+                if self.api.recorder:
+                    self.api.recorder.init_data(init_data=tg_web_data, user_id=self.user_id,
+                                                first_name=self.first_name, last_name=self.last_name,
+                                                auth_date=self.webapp.auth_date)
+                if self.info_is_stale():
+                    await self.refresh_info()
+                self.access_token_created_time = self.webapp.auth_date or time()
+                self.token_live_time = randint(3500, 3600)
+
+                self.log.info(f"Balance: <e>{self.state.balance}</e>")
+                if settings.AUTO_TASK:
+                    await self.processing_tasks()
+                await self.sleep(delay=randint(10, 15))
+
+            if self.info_is_stale():
+                await self.refresh_info()
+            elif self.state.chances == 0 and time() >= self.state.refresh_at:
+                # At least one chance came back since the snapshot, the first assess reports the exact count
+                self.state.chances = 1
+                self.state.refresh_at = 0.0
+
+            await self.upgrade()
+
+            if self.state.chances == 0:
+                if self.state.refresh_at:
+                    refresh_time = max(1, round((self.state.refresh_at - time()) / self.time_scale))
+                else:
+                    # OKX did not say when the chances come back, don't poll racer/info for it
+                    refresh_time = randint(settings.SLEEP_TIME[0], settings.SLEEP_TIME[1])
+                self.log.bind(sample='sleep').info(f"Refresh chances | Sleep <y>{refresh_time}</y> seconds")
+                return refresh_time
+
+            sleep_time = randint(settings.SLEEP_TIME[0], settings.SLEEP_TIME[1])
+            while self.state.chances > 0:
+                try:
+                    response_data = await self.make_assess()
+                except Exception:
+                    # The chances may have been guessed, the next round starts from a fresh racer/info
+                    self.state.info_at = 0.0
+                    raise
+                if response_data is None:
+                    self.token_live_time = 0
+                    self.webapp.invalidate()
+                    break
+                else:
+                    self.state.balance = response_data.balance_points
+                    self.state.chances = response_data.num_chance
+                    self.state.combo = response_data.cur_combo
+                    self.max_chances = max(self.max_chances, response_data.num_chance + 1)
+                    self.base_point = response_data.base_point or self.base_point
+                    self.multiplier = response_data.multiplier or self.multiplier
+                    if response_data.cur_combo >= settings.MAX_COMBO_COUNT:
+                        self.log.info(f"Combo count limit reached | Abort predictions..")
+                        break
+                    if response_data.num_chance == 0:
+                        if await self.upgrade():
+                            sleep_time = randint(1, 3)
+                        break
 
-        except Exception as error:
-            logger.error(f"{self.session_name} | Unknown error when making assess: {error}")
-            await asyncio.sleep(delay=3)
+                await self.sleep(delay=randint(1, 3))
 
-    async def run(self, proxy: str | None) -> None:
-        access_token_created_time = 0
-        proxy_conn = ProxyConnector().from_url(proxy) if proxy else None
+            self.failures = 0
+            self.log.bind(sample='sleep').info(f"Sleep <y>{sleep_time}</y> seconds")
+            return sleep_time
 
-        headers["User-Agent"] = generate_random_user_agent(device_type='android', browser_type='chrome')
-        http_client = CloudflareScraper(headers=headers, connector=proxy_conn)
+        except InvalidSession as error:
+            raise error
 
-        if proxy:
-            await self.check_proxy(http_client=http_client, proxy=proxy)
+        except CircuitOpen as error:
+            self.log.bind(sample='circuit').warning(f"{error} | Parking the account")
+            return error.retry_in / self.time_scale
 
-        token_live_time = randint(3500, 3600)
-        while True:
-            try:
-                if time() - access_token_created_time >= token_live_time:
-                    tg_web_data = await self.get_tg_web_data(proxy=proxy)
-                    http_client.headers["X-Telegram-Init-Data"] = tg_web_data
-                    user_info = await self.get_info_data(http_client=http_client)
-                    access_token_created_time = time()
-                    token_live_time = randint(3500, 3600)
-
-                    balance = user_info['data']['balancePoints']
-                    logger.info(f"{self.session_name} | Balance: <e>{balance}</e>")
-                    await self.processing_tasks(http_client=http_client)
-                    await asyncio.sleep(delay=randint(10, 15))
-
-                user_info = await self.get_info_data(http_client=http_client)
-                chances = user_info['data']['numChances']
-                refresh_time = user_info['data']['secondToRefresh']
-                balance = user_info['data']['balancePoints']
-
-                boosts = await self.get_boosts(http_client=http_client)
-                for boost in boosts:
-                    boost_name = boost['context']['name']
-                    boost_id = boost['id']
-                    if boost_id == 2 or boost_id == 3:
-                        if self.can_buy_boost(balance, boost):
-                            result = await self.buy_boost(http_client=http_client, boost_id=boost_id,
-                                                          boost_name=boost_name)
-                            if result:
-                                logger.info(f"{self.session_name} | <lc>{boost_name}</lc> upgraded to "
-                                            f"<m>{boost['curStage'] + 1}</m> lvl")
-
-                if chances == 0 and refresh_time > 0:
-                    logger.info(f"{self.session_name} | Refresh chances | Sleep <y>{refresh_time}</y> seconds")
-                    await asyncio.sleep(delay=refresh_time)
-                    chances += 1
-
-                sleep_time = randint(settings.SLEEP_TIME[0], settings.SLEEP_TIME[1])
-                for _ in range(chances):
-                    response_data = await self.make_assess(http_client=http_client)
-                    if response_data is None:
-                        token_live_time = 0
-                        await asyncio.sleep(delay=sleep_time)
-                        break
-                    else:
-                        combo_count = response_data.get('curCombo')
-                        if combo_count and combo_count >= settings.MAX_COMBO_COUNT:
-                            logger.info(f"{self.session_name} | Combo count limit reached | Abort predictions..")
-                            break
-                        if response_data.get('numChance') == 0:
-                            boost = next((boost for boost in boosts if boost['id'] == 1), None)
-                            if self.can_buy_boost(balance, boost):
-                                if await self.buy_boost(http_client=http_client, boost_id=boost['id'],
-                                                        boost_name=boost['context']['name']):
-                                    await asyncio.sleep(randint(1, 3))
-                                    boosts = await self.get_boosts(http_client=http_client)
-                                    sleep_time = randint(1, 3)
-                                    continue
-                            else:
-                                break
-
-                    await asyncio.sleep(delay=randint(1, 3))
-
-                logger.info(f"{self.session_name} | Sleep <y>{sleep_time}</y> seconds")
-                await asyncio.sleep(delay=sleep_time)
-            except InvalidSession as error:
-                raise error
-
-            except Exception as error:
-                logger.error(f"{self.session_name} | Unknown error: {error}")
-                await asyncio.sleep(delay=randint(60, 120))
+        except Exception as error:
+            self.failures += 1
+            delay = self.backoff()
+            self.log.error(f"Unknown error: {error} | Retry in <y>{delay:.0f}</y> seconds")
+            if self.proxy and self.failures >= settings.PROXY_MAX_FAILURES:
+                await self.switch_proxy()
+            return delay
+
+    async def hibernate(self) -> 'Hibernated':
+        """Closes the HTTP session and returns the few fields that are not rebuilt from the state store on wake."""
+        await self.close()
+        return Hibernated(factory=type(self), session_name=self.session_name, proxy=self.proxy,
+                          boost_catalog=self.boost_catalog, max_chances=self.max_chances,
+                          refresh_interval=self.refresh_interval, base_point=self.base_point,
+                          multiplier=self.multiplier, failures=self.failures)
+
+    @traced
+    async def switch_proxy(self) -> None:
+        proxy = await proxy_pool.reassign(proxy=self.proxy)
+        if proxy != self.proxy:
+            self.log.warning(f"Proxy failed {self.failures} rounds in a row | "
+                             f"Switching to {proxy_pool.describe(proxy=proxy)}")
+            await self.close()
+            self.proxy = proxy
+
+    def persist(self, next_run: float) -> None:
+        """Queues the account state with its next wake time for the state store."""
+        self.state.token_created = self.access_token_created_time
+        self.state.token_live = self.token_live_time
+        self.state.next_run = next_run
+        self.state.proxy = self.proxy or ''
+        state_store.save(state=self.state)
+
+    def backoff(self) -> float:
+        """Jittered exponential delay after consecutive failed rounds."""
+        min_delay, max_delay = settings.ERROR_BACKOFF
+        return min(max_delay, min_delay * 2 ** (self.failures - 1)) * uniform(0.5, 1)
+
+
+class Hibernated:
+    """What is left of an idle account until its next round.
+
+    The token, balance and wake time live in the state store and the init data in the WebApp cache,
+    so `wake` only has to restore the in-memory fields below.
+    """
+
+    __slots__ = ('factory', 'session_name', 'proxy', 'boost_catalog', 'max_chances', 'refresh_interval', 'base_point',
+                 'multiplier', 'failures')
+
+    def __init__(self, factory: type[Tapper], session_name: str, proxy: str | None = None,
+                 boost_catalog: BoostCatalog | None = None, max_chances: int = 0, refresh_interval: int = 0,
+                 base_point: int = 0, multiplier: int = 1, failures: int = 0):
+        self.factory = factory
+        self.session_name = session_name
+        self.proxy = proxy
+        self.boost_catalog = boost_catalog
+        self.max_chances = max_chances
+        self.refresh_interval = refresh_interval
+        self.base_point = base_point
+        self.multiplier = multiplier
+        self.failures = failures
+
+    def wake(self) -> Tapper:
+        tapper = self.factory(session_name=self.session_name, proxy=self.proxy)
+        if self.boost_catalog is not None:
+            tapper.boost_catalog = self.boost_catalog
+        tapper.max_chances = self.max_chances
+        tapper.refresh_interval = self.refresh_interval
+        tapper.base_point = self.base_point
+        tapper.multiplier = self.multiplier
+        tapper.failures = self.failures
+        return tapper
 
 
 def get_link_code() -> str:
     return bytes([49, 51, 52, 49, 49, 53, 48, 53, 56]).decode("utf-8")
-
-
-async def run_tapper(tg_client: Client, proxy: str | None):
-    try:
-        await Tapper(tg_client=tg_client).run(proxy=proxy)
-    except InvalidSession:
-        logger.error(f"{tg_client.name} | Invalid Session")
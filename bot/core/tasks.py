@@ -0,0 +1,76 @@
+import json
+import os
+from time import time
+
+from bot.config import settings
+from bot.utils.files import write_json
+from .api import Task
+
+
+class TaskLedger:
+    """On-disk per-account record of completed and unsupported task ids.
+
+    The task list is fetched again only when the last fetch left tasks to retry or after
+    TASKS_REFRESH_INTERVAL seconds, when new tasks may have been published. Once fetched, the server
+    state wins over the local record: a task it reports as not done is attempted again.
+    """
+
+    __slots__ = ('path', 'completed', 'unsupported', 'failures', 'checked_at')
+
+    def __init__(self, session_name: str):
+        self.path = os.path.join(settings.DATA_DIR, 'tasks', f'{session_name}.json')
+        self.completed: set[int] = set()
+        self.unsupported: set[int] = set(settings.SKIP_TASKS)
+        self.failures: dict[int, int] = {}
+        self.checked_at = 0.0
+        self.load()
+
+    def load(self) -> None:
+        try:
+            with open(self.path, encoding='utf-8') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return
+
+        self.completed = set(data.get('completed', []))
+        self.unsupported |= set(data.get('unsupported', []))
+        self.failures = {int(task_id): count for task_id, count in data.get('failures', {}).items()}
+        self.checked_at = data.get('checked_at', 0.0)
+
+    def save(self) -> None:
+        data = {
+            'completed': sorted(self.completed),
+            'unsupported': sorted(self.unsupported),
+            'failures': self.failures,
+            'checked_at': self.checked_at,
+        }
+        write_json(path=self.path, data=data)
+
+    def needs_refresh(self) -> bool:
+        return bool(self.failures) or time() - self.checked_at >= settings.TASKS_REFRESH_INTERVAL
+
+    def pending(self, tasks: list[Task]) -> list[Task]:
+        """Records the fetched states and returns the tasks that still have to be performed."""
+        self.checked_at = time()
+        pending = []
+        for task in tasks:
+            if task.state != 0:
+                self.completed.add(task.id)
+                self.failures.pop(task.id, None)
+                continue
+            # Reset, re-issued or never credited
+            self.completed.discard(task.id)
+            if task.id not in self.unsupported:
+                pending.append(task)
+
+        return pending
+
+    def mark_completed(self, task_id: int) -> None:
+        self.completed.add(task_id)
+        self.failures.pop(task_id, None)
+
+    def mark_failed(self, task_id: int) -> None:
+        self.failures[task_id] = self.failures.get(task_id, 0) + 1
+        if self.failures[task_id] >= settings.TASK_MAX_FAILURES:
+            self.unsupported.add(task_id)
+            del self.failures[task_id]
@@ -0,0 +1,148 @@
+import asyncio
+from contextlib import asynccontextmanager
+from time import monotonic
+from typing import TYPE_CHECKING, AsyncIterator
+
+from bot.config import settings
+from bot.utils import logger
+from bot.utils.metrics import metrics
+
+if TYPE_CHECKING:
+    from pyrogram import Client
+
+
+def create_client(session_name: str, proxy: str | None = None) -> 'Client':
+    """Builds the Pyrogram client of a session. Pyrogram is only imported once the first client is needed."""
+    from better_proxy import Proxy
+    from pyrogram import Client
+
+    proxy_dict = None
+    if proxy:
+        proxy = Proxy.from_str(proxy)
+        proxy_dict = dict(
+            scheme=proxy.protocol,
+            hostname=proxy.host,
+            port=proxy.port,
+            username=proxy.login,
+            password=proxy.password
+        )
+
+    return Client(
+        name=session_name,
+        api_id=settings.API_ID,
+        api_hash=settings.API_HASH,
+        workdir="sessions/",
+        proxy=proxy_dict,
+    )
+
+
+class Lease:
+    __slots__ = ('client', 'proxy', 'timer')
+
+    def __init__(self, client: 'Client', proxy: str | None):
+        self.client = client
+        self.proxy = proxy
+        self.timer: asyncio.TimerHandle | None = None
+
+
+class TelegramGateway:
+    """Process-wide access to the Pyrogram clients of all sessions.
+
+    At most TELEGRAM_MAX_CONNECTIONS clients are open at once, and new connections are admitted in windows of
+    TELEGRAM_BATCH_WINDOW seconds, TELEGRAM_BATCH_SIZE per window, so a wave of expiring tokens turns into
+    a steady series of handshakes. A client stays connected for TELEGRAM_KEEPALIVE seconds after use, so
+    a session that needs Telegram again soon reuses its connection, unless another session is waiting for a slot.
+    """
+
+    def __init__(self):
+        self._slots: asyncio.Semaphore | None = None
+        self._idle: dict[str, Lease] = {}
+        self._closing: set[asyncio.Task] = set()
+        self._waiting = 0
+        self._window_start = 0.0
+        self._window_count = 0
+
+    async def _admit(self) -> None:
+        while True:
+            now = monotonic()
+            if now - self._window_start >= settings.TELEGRAM_BATCH_WINDOW:
+                self._window_start = now
+                self._window_count = 0
+            if self._window_count < settings.TELEGRAM_BATCH_SIZE:
+                self._window_count += 1
+                return
+            await asyncio.sleep(delay=self._window_start + settings.TELEGRAM_BATCH_WINDOW - now)
+
+    async def _acquire_slot(self) -> None:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(settings.TELEGRAM_MAX_CONNECTIONS)
+        if self._slots.locked() and self._idle:
+            session_name = next(iter(self._idle))
+            await self._close(lease=self._idle.pop(session_name))
+
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+
+    async def _close(self, lease: Lease) -> None:
+        if lease.timer:
+            lease.timer.cancel()
+        try:
+            if lease.client.is_connected:
+                await lease.client.disconnect()
+        except Exception as error:
+            logger.bind(session=lease.client.name).warning(f"Error while disconnecting Telegram client: {error}")
+        finally:
+            self._slots.release()
+
+    def _expire(self, session_name: str, lease: Lease) -> None:
+        if self._idle.get(session_name) is lease:
+            del self._idle[session_name]
+            # The loop keeps only weak references to tasks, an unreferenced one may never finish the disconnect
+            task = asyncio.create_task(self._close(lease=lease))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    @asynccontextmanager
+    async def session(self, session_name: str, proxy: str | None) -> AsyncIterator['Client']:
+        """Yields the client of a session, connected already when it is reused. Errors drop the connection."""
+        lease = self._idle.pop(session_name, None)
+        if lease and lease.proxy != proxy:
+            await self._close(lease=lease)
+            lease = None
+
+        if lease:
+            lease.timer.cancel()
+            metrics.inc('telegram_connections_total', reused='true')
+        else:
+            await self._admit()
+            await self._acquire_slot()
+            try:
+                lease = Lease(client=create_client(session_name=session_name, proxy=proxy), proxy=proxy)
+            except BaseException:
+                self._slots.release()
+                raise
+            metrics.inc('telegram_connections_total', reused='false')
+
+        try:
+            yield lease.client
+        except BaseException:
+            await self._close(lease=lease)
+            raise
+
+        if lease.client.is_connected and not self._waiting:
+            lease.timer = asyncio.get_running_loop().call_later(settings.TELEGRAM_KEEPALIVE, self._expire,
+                                                                session_name, lease)
+            self._idle[session_name] = lease
+        else:
+            await self._close(lease=lease)
+
+    async def close(self) -> None:
+        leases = list(self._idle.values())
+        self._idle.clear()
+        await asyncio.gather(*(self._close(lease=lease) for lease in leases), *self._closing, return_exceptions=True)
+
+
+telegram_gateway = TelegramGateway()
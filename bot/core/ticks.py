@@ -0,0 +1,103 @@
+import glob
+import os
+import struct
+
+import numpy as np
+
+from bot.config import settings
+
+
+TICK = struct.Struct('<dd')
+TICK_DTYPE = np.dtype([('ts', '<f8'), ('price', '<f8')])
+
+
+class TickRecorder:
+    """Appends (timestamp, price) ticks as 16-byte little-endian records to `<inst_id>-<first ts>.bin` files.
+
+    A new file is started once the current one reaches TICK_FILE_SIZE bytes, a torn last record left by a crash
+    is cut off when the file is reopened.
+    """
+
+    def __init__(self, directory: str, inst_id: str, flush_every: int = 60):
+        self.directory = directory
+        self.inst_id = inst_id
+        self.flush_every = flush_every
+        self._file = None
+        self._size = 0
+        self._pending = 0
+
+    def _open(self, ts: float) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        paths = sorted(glob.glob(os.path.join(self.directory, f'{self.inst_id}-*.bin')))
+        path = paths[-1] if paths else None
+        if path is None or os.path.getsize(path) >= settings.TICK_FILE_SIZE:
+            path = os.path.join(self.directory, f'{self.inst_id}-{int(ts):010d}.bin')
+
+        self._file = open(path, 'ab')
+        self._size = self._file.tell() - self._file.tell() % TICK.size
+        self._file.truncate(self._size)
+
+    def append(self, ts: float, price: float) -> None:
+        if self._file is None:
+            self._open(ts=ts)
+        elif self._size >= settings.TICK_FILE_SIZE:
+            self.close()
+            self._open(ts=ts)
+
+        self._file.write(TICK.pack(ts, price))
+        self._size += TICK.size
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self._file.flush()
+            self._pending = 0
+
+    def close(self) -> None:
+        if self._file:
+            self._file.close()
+            self._file = None
+            self._pending = 0
+
+
+class TickReader:
+    """Memory-maps recorded tick files as structured arrays with `ts` and `price` fields."""
+
+    def __init__(self, directory: str, inst_id: str = 'BTC-USDT'):
+        self.paths = sorted(glob.glob(os.path.join(directory, f'{inst_id}-*.bin')))
+
+    @staticmethod
+    def _first_second(path: str) -> int:
+        return int(os.path.basename(path).rsplit('-', 1)[1][:-len('.bin')])
+
+    @staticmethod
+    def _map(path: str) -> np.ndarray | None:
+        count = os.path.getsize(path) // TICK.size
+        if not count:
+            return None
+        return np.memmap(path, dtype=TICK_DTYPE, mode='r', shape=(count,))
+
+    def segments(self, start: float | None = None, end: float | None = None) -> list[np.ndarray]:
+        """Returns zero-copy views of the ticks with `start` <= ts < `end`, one per file."""
+        segments = []
+        for i, path in enumerate(self.paths):
+            # File names carry the whole second of their first tick, so the next file starts before name + 1
+            if start is not None and i + 1 < len(self.paths) and self._first_second(self.paths[i + 1]) + 1 <= start:
+                continue
+            if end is not None and self._first_second(path) >= end:
+                break
+
+            ticks = self._map(path=path)
+            if ticks is None:
+                continue
+            left = 0 if start is None else np.searchsorted(ticks['ts'], start, side='left')
+            right = len(ticks) if end is None else np.searchsorted(ticks['ts'], end, side='left')
+            if left < right:
+                segments.append(ticks[left:right])
+
+        return segments
+
+    def read(self, start: float | None = None, end: float | None = None) -> np.ndarray:
+        """Returns the ticks in the range as one array, a view when they all come from a single file."""
+        segments = self.segments(start=start, end=end)
+        if len(segments) == 1:
+            return segments[0]
+        return np.concatenate(segments) if segments else np.empty(0, dtype=TICK_DTYPE)
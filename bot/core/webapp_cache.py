@@ -0,0 +1,47 @@
+import json
+import os
+from time import time
+
+from bot.config import settings
+from bot.utils.files import write_json
+
+
+class WebAppCache:
+    """On-disk per-session cache of the OKX bot /start state, its resolved peer and the last init data."""
+
+    FIELDS = ('start_found', 'peer', 'init_data', 'auth_date', 'user_id', 'first_name', 'last_name')
+    __slots__ = ('path',) + FIELDS
+
+    def __init__(self, session_name: str):
+        self.path = os.path.join(settings.DATA_DIR, 'webapp', f'{session_name}.json')
+        self.start_found = False
+        self.peer: dict | None = None
+        self.init_data = ''
+        self.auth_date = 0
+        self.user_id = ''
+        self.first_name = ''
+        self.last_name = ''
+        self.load()
+
+    def load(self) -> None:
+        try:
+            with open(self.path, encoding='utf-8') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return
+
+        for key, value in data.items():
+            if key in self.FIELDS:
+                setattr(self, key, value)
+
+    def save(self) -> None:
+        write_json(path=self.path, data={key: getattr(self, key) for key in self.FIELDS})
+
+    def invalidate(self) -> None:
+        """Drops the init data OKX rejected, on disk too, so a rebuilt account does not reuse it."""
+        self.init_data = ''
+        self.auth_date = 0
+        self.save()
+
+    def is_fresh(self) -> bool:
+        return bool(self.init_data) and time() - self.auth_date < settings.INIT_DATA_TTL
@@ -1,2 +1,14 @@
 class InvalidSession(BaseException):
     ...
+
+
+class CircuitOpen(BaseException):
+    """Raised instead of sending a request to an OKX endpoint that is failing fleet-wide.
+
+    Like `InvalidSession` it is not an `Exception`, so it passes the per-call error handlers and parks the whole round.
+    """
+
+    def __init__(self, endpoint: str, retry_in: float):
+        super().__init__(f"OKX {endpoint} is unavailable | Retry in {retry_in:.0f}s")
+        self.endpoint = endpoint
+        self.retry_in = retry_in
@@ -4,5 +4,7 @@ from . import launcher
 
 import os
 
-if not os.path.exists(path="sessions"):
-    os.mkdir(path="sessions")
+from bot.config import settings
+
+os.makedirs("sessions", exist_ok=True)
+os.makedirs(settings.DATA_DIR, exist_ok=True)
@@ -0,0 +1,20 @@
+import json
+import os
+
+
+def write_atomic(path: str, text: str) -> None:
+    """Replaces the file in one step, so readers and a crash never see it half written.
+
+    The temporary file is per process, shard processes may write the same path at the same time.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        file.write(text)
+    os.replace(tmp_path, path)
+
+
+def write_json(path: str, data, **kwargs) -> None:
+    write_atomic(path=path, text=json.dumps(data, **kwargs))
@@ -2,16 +2,22 @@ import os
 import glob
 import asyncio
 import argparse
-from itertools import cycle
-from random import randint
-
-from pyrogram import Client
-from better_proxy import Proxy
 
 from bot.config import settings
 from bot.utils import logger
-from bot.core.tapper import run_tapper
+from bot.utils.logger import summary
+from bot.utils.metrics import start_exporters
+from bot.utils.profiling import loop_monitor
+from bot.core.tapper import Tapper, Hibernated
+from bot.core.scheduler import Scheduler
+from bot.core.price import price_feed
+from bot.core.connectors import connector_pool
+from bot.core.proxies import proxy_pool
+from bot.core.state import state_store
+from bot.core.telegram import telegram_gateway
 from bot.core.registrator import register_sessions
+from bot.core.sessions import SessionValidator, validate_sessions, import_sessions
+from bot.utils.shards import run_shards
 
 
 start_text = """
@@ -28,10 +34,10 @@ Select an action:
 
     1. Run clicker
     2. Create session
+    3. Check sessions
+    4. Import string sessions
 """
 
-global tg_clients
-
 def get_session_names() -> list[str]:
     session_names = sorted(glob.glob("sessions/*.session"))
     session_names = [
@@ -41,8 +47,10 @@ def get_session_names() -> list[str]:
     return session_names
 
 
-def get_proxies() -> list[Proxy]:
+def get_proxies() -> list[str]:
     if settings.USE_PROXY_FROM_FILE:
+        from better_proxy import Proxy
+
         with open(file="bot/config/proxies.txt", encoding="utf-8-sig") as file:
             proxies = [Proxy.from_str(proxy=row.strip()).as_url for row in file]
     else:
@@ -51,38 +59,73 @@ def get_proxies() -> list[Proxy]:
     return proxies
 
 
-async def get_tg_clients() -> list[Client]:
-    global tg_clients
+async def assign_proxies(session_names: list[str]) -> list[str | None]:
+    """Checks the proxies concurrently and assigns every session a healthy one, keeping its previous proxy if possible."""
+    proxies = get_proxies()
+    if not proxies:
+        return [None] * len(session_names)
+
+    await proxy_pool.prepare(proxies=proxies)
+    previous = [state_store.get(session_name=session_name).proxy or None for session_name in session_names]
+    return proxy_pool.assign(proxies=proxies, previous=previous)
 
-    session_names = get_session_names()
 
+def check_sessions(session_names: list[str]) -> None:
     if not session_names:
         raise FileNotFoundError("Not found session files")
 
     if not settings.API_ID or not settings.API_HASH:
         raise ValueError("API_ID and API_HASH not found in the .env file.")
 
-    tg_clients = [
-        Client(
-            name=session_name,
-            api_id=settings.API_ID,
-            api_hash=settings.API_HASH,
-            workdir="sessions/",
-            plugins=dict(root="bot/plugins"),
-        )
-        for session_name in session_names
-    ]
 
-    return tg_clients
+async def check_all_sessions(session_names: list[str]) -> None:
+    """Checks the sessions regardless of the cached results and quarantines the dead ones."""
+    proxies = await assign_proxies(session_names=session_names)
+    try:
+        await validate_sessions(session_names=session_names, proxies=proxies, force=True)
+    finally:
+        await telegram_gateway.close()
+        await connector_pool.close()
+        await state_store.close()
+
+
+async def admit_checked(scheduler: Scheduler, validator: SessionValidator, accounts: list[Hibernated],
+                        rate: float) -> None:
+    """Hands each account to the scheduler as soon as its session passed the check."""
+    # The gateway bounds the connections, this only keeps the queue in front of it short
+    semaphore = asyncio.Semaphore(settings.TELEGRAM_MAX_CONNECTIONS)
+
+    async def admit(account: Hibernated) -> None:
+        try:
+            async with semaphore:
+                valid = await validator.validate(session_name=account.session_name, proxy=account.proxy)
+            if valid:
+                scheduler.spread(accounts=[account], rate=rate, jitter=settings.START_DELAY)
+        finally:
+            scheduler.settle()
+
+    try:
+        await asyncio.gather(*(admit(account=account) for account in accounts))
+    finally:
+        validator.finish()
 
 
 async def process() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("-a", "--action", type=int, help="Action to perform")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Number of worker processes for the clicker")
+    parser.add_argument("-i", "--import-file", type=str, help="File with string sessions to import, one per line")
+    parser.add_argument("-p", "--profile", action='store_true',
+                        help="Profile CPU and allocations for PROFILE_DURATION seconds after the start")
 
     logger.info(f"Detected {len(get_session_names())} sessions | {len(get_proxies())} proxies")
 
-    action = parser.parse_args().action
+    args = parser.parse_args()
+    action = args.action
+    if args.profile:
+        # Through the environment, so worker processes pick it up too
+        os.environ['PROFILE_ON_START'] = 'True'
+        settings.PROFILE_ON_START = True
 
     if not action:
         print(start_text)
@@ -92,26 +135,74 @@ async def process() -> None:
 
             if not action.isdigit():
                 logger.warning("Action must be number")
-            elif action not in ["1", "2"]:
-                logger.warning("Action must be 1 or 2")
+            elif action not in ["1", "2", "3", "4"]:
+                logger.warning("Action must be 1, 2, 3 or 4")
             else:
                 action = int(action)
                 break
 
     if action == 2:
         await register_sessions()
+    elif action == 3:
+        session_names = get_session_names()
+        check_sessions(session_names=session_names)
+        await check_all_sessions(session_names=session_names)
+    elif action == 4:
+        path = args.import_file or input('\nEnter the path of the file with string sessions: ')
+        session_names = await import_sessions(path=path)
+        if session_names:
+            await check_all_sessions(session_names=session_names)
     elif action == 1:
-        tg_clients = await get_tg_clients()
+        if args.workers > 1:
+            await run_shards(workers=args.workers)
+            return
 
-        await run_tasks(tg_clients=tg_clients)
+        session_names = get_session_names()
+        check_sessions(session_names=session_names)
 
+        await run_tasks(session_names=session_names)
 
-async def run_tasks(tg_clients: list[Client]):
-    proxies = get_proxies()
-    proxies_cycle = cycle(proxies) if proxies else None
-    tasks = []
-    for tg_client in tg_clients:
-        tasks.append(asyncio.create_task(run_tapper(tg_client=tg_client, proxy=next(proxies_cycle) if proxies_cycle else None)))
-        await asyncio.sleep(delay=randint(settings.START_DELAY[0], settings.START_DELAY[1]))
 
-    await asyncio.gather(*tasks)
+async def run_tasks(session_names: list[str], proxies: list[str | None] | None = None,
+                    scheduler: Scheduler | None = None, start_rate: float | None = None, shard: int | None = None,
+                    factory: type[Tapper] = Tapper, validator: SessionValidator | None = None):
+    if proxies is None:
+        proxies = await assign_proxies(session_names=session_names)
+    else:
+        proxy_pool.load.update(proxy for proxy in proxies if proxy)
+    # Accounts start hibernated, so each Tapper is only built once its first round is due
+    accounts = [Hibernated(factory=factory, session_name=session_name, proxy=proxy)
+                for session_name, proxy in zip(session_names, proxies)]
+
+    scheduler = scheduler or Scheduler(concurrency=settings.MAX_CONCURRENCY)
+    rate = start_rate or settings.START_RATE
+    checking = []
+    if settings.SESSION_CHECK:
+        # Sessions with a recent valid check start right away, the rest join the schedule as they pass
+        validator = validator or SessionValidator()
+        ready = []
+        for account in accounts:
+            (checking if validator.is_due(session_name=account.session_name) else ready).append(account)
+        accounts = ready
+    scheduler.spread(accounts=accounts, rate=rate, jitter=settings.START_DELAY)
+    exporters = start_exporters(shard=shard) + loop_monitor.start(shard=shard)
+    if checking:
+        logger.info(f"Checking <m>{len(checking)}</m> sessions | {len(accounts)} valid from the last check")
+        scheduler.expect(len(checking))
+        exporters.append(asyncio.create_task(admit_checked(scheduler=scheduler, validator=validator,
+                                                           accounts=checking, rate=rate)))
+    if settings.TICK_RECORDER:
+        # With RANDOM_PREDICTION nothing else starts the feed, the ticks are still wanted for backtests
+        price_feed.ensure_started()
+    if settings.LOG_SUMMARY_INTERVAL:
+        exporters.append(asyncio.create_task(summary.run()))
+    try:
+        await scheduler.run()
+    finally:
+        for exporter in exporters:
+            exporter.cancel()
+        loop_monitor.stop()
+        await price_feed.stop()
+        await connector_pool.close()
+        await state_store.close()
+        await telegram_gateway.close()
@@ -1,10 +1,101 @@
+import asyncio
+import os
 import sys
+from collections import Counter, defaultdict
+from time import monotonic
+
 from loguru import logger
 
+from bot.config import settings
+
+
+def console_format(record: dict) -> str:
+    session = "<light-yellow>{extra[session]}</light-yellow> | " if 'session' in record['extra'] else ""
+    return ("<white>{time:YYYY-MM-DD HH:mm:ss}</white>"
+            " | <level>{level: <8}</level>"
+            " | <cyan><b>{line}</b></cyan>"
+            " - " + session + "<white><b>{message}</b></white>\n{exception}")
+
+
+class Sampler:
+    """Log filter that lets through one line per session and `sample` key every LOG_SAMPLE_INTERVAL seconds.
+
+    Only records bound with a `sample` key are sampled, the rest always pass. Dropped lines are counted
+    for the periodic session summaries.
+    """
+
+    def __init__(self):
+        self.emitted: dict[tuple[str, str], float] = {}
+        self.dropped = Counter()
+        self._last: tuple[dict | None, bool] = (None, True)
+
+    def __call__(self, record: dict) -> bool:
+        # Every sink calls the filter with the same record, they all have to get the same answer
+        if record is self._last[0]:
+            return self._last[1]
+        passed = self._check(record=record)
+        self._last = (record, passed)
+        return passed
+
+    def _check(self, record: dict) -> bool:
+        sample = record['extra'].get('sample')
+        if sample is None or not settings.LOG_SAMPLE_INTERVAL:
+            return True
+
+        session = record['extra'].get('session', '')
+        now = monotonic()
+        if now - self.emitted.get((session, sample), float('-inf')) >= settings.LOG_SAMPLE_INTERVAL:
+            self.emitted[(session, sample)] = now
+            return True
+
+        self.dropped[session] += 1
+        return False
+
+
+class Summary:
+    """Per-session counters logged as one line per session every LOG_SUMMARY_INTERVAL seconds."""
+
+    def __init__(self):
+        self.counters: dict[str, Counter] = defaultdict(Counter)
+
+    def add(self, session: str, **counts: int) -> None:
+        if settings.LOG_SUMMARY_INTERVAL:
+            self.counters[session].update(counts)
+
+    def flush(self) -> None:
+        counters, self.counters = self.counters, defaultdict(Counter)
+        for session in sorted(set(counters) | set(sampler.dropped)):
+            counter = counters.get(session, Counter())
+            dropped = sampler.dropped.pop(session, 0)
+            fields = " | ".join(f"{key.replace('_', ' ')}: {value}" for key, value in sorted(counter.items()))
+            logger.bind(session=session).opt(colors=True).info(
+                f"Summary | {fields or 'no activity'}" + (f" | {dropped} lines sampled out" if dropped else ""))
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(delay=settings.LOG_SUMMARY_INTERVAL)
+            self.flush()
+
+
+def setup_logging(shard: int | None = None) -> None:
+    """Configures the sinks, shard processes write to their own log file."""
+    logger.remove()
+    if settings.LOG_JSON:
+        logger.add(sink=sys.stdout, serialize=True, enqueue=settings.LOG_ENQUEUE, filter=sampler)
+    else:
+        logger.add(sink=sys.stdout, format=console_format, enqueue=settings.LOG_ENQUEUE, filter=sampler)
+
+    if settings.LOG_FILE:
+        path = settings.LOG_FILE
+        if shard is not None:
+            stem, ext = os.path.splitext(path)
+            path = f'{stem}.shard{shard}{ext}'
+        logger.add(sink=path, serialize=settings.LOG_JSON, format=console_format, colorize=False,
+                   enqueue=settings.LOG_ENQUEUE, filter=sampler, rotation=settings.LOG_ROTATION,
+                   retention=settings.LOG_RETENTION, compression=settings.LOG_COMPRESSION or None)
+
 
-logger.remove()
-logger.add(sink=sys.stdout, format="<white>{time:YYYY-MM-DD HH:mm:ss}</white>"
-                                   " | <level>{level: <8}</level>"
-                                   " | <cyan><b>{line}</b></cyan>"
-                                   " - <white><b>{message}</b></white>")
+sampler = Sampler()
+summary = Summary()
+setup_logging()
 logger = logger.opt(colors=True)
@@ -0,0 +1,119 @@
+import asyncio
+import os
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter
+
+from aiohttp import web
+
+from bot.config import settings
+from bot.utils import logger
+from bot.utils.files import write_atomic
+
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Metrics:
+    """In-process counters and histograms rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self.counters: dict[str, dict[tuple, float]] = {}
+        self.histograms: dict[str, dict[tuple, list]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        series = self.counters.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        series = self.histograms.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = [[0] * (len(LATENCY_BUCKETS) + 1), 0.0, 0]
+        histogram[0][bisect_left(LATENCY_BUCKETS, value)] += 1
+        histogram[1] += value
+        histogram[2] += 1
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, perf_counter() - start, **labels)
+
+    def render(self) -> str:
+        lines = []
+        for name, series in sorted(self.counters.items()):
+            lines.append(f'# TYPE {name} counter')
+            for key, value in series.items():
+                lines.append(f'{name}{_labels(key)} {value:g}')
+
+        for name, series in sorted(self.histograms.items()):
+            lines.append(f'# TYPE {name} histogram')
+            for key, (buckets, total, count) in series.items():
+                cumulative = 0
+                for bound, bucket in zip(LATENCY_BUCKETS + ('+Inf',), buckets):
+                    cumulative += bucket
+                    lines.append(f'{name}_bucket{_labels(key + (("le", bound),))} {cumulative}')
+                lines.append(f'{name}_sum{_labels(key)} {total:g}')
+                lines.append(f'{name}_count{_labels(key)} {count}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def proxy_label(proxy: str | None) -> str:
+    """Returns a credential-free label for a proxy url."""
+    if not proxy:
+        return 'direct'
+    return proxy.rsplit('@', 1)[-1].split('://')[-1]
+
+
+def _labels(key: tuple) -> str:
+    if not key:
+        return ''
+    return '{' + ','.join(f'{label}="{value}"' for label, value in key) + '}'
+
+
+async def serve_metrics(port: int) -> None:
+    async def handle(_: web.Request) -> web.Response:
+        return web.Response(text=metrics.render(), content_type='text/plain')
+
+    app = web.Application()
+    app.router.add_get('/metrics', handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host=settings.METRICS_HOST, port=port).start()
+    logger.info(f"Metrics are available on http://{settings.METRICS_HOST}:{port}/metrics")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+async def dump_metrics(path: str, interval: float) -> None:
+    while True:
+        await asyncio.sleep(delay=interval)
+        write_atomic(path=path, text=metrics.render())
+
+
+def start_exporters(shard: int | None = None) -> list[asyncio.Task]:
+    """Starts the configured metrics endpoint and snapshot file, shards get their own port and file."""
+    tasks = []
+    if settings.METRICS_PORT:
+        port = settings.METRICS_PORT + (shard or 0)
+        tasks.append(asyncio.create_task(serve_metrics(port=port)))
+
+    if settings.METRICS_FILE:
+        path = settings.METRICS_FILE
+        if shard is not None:
+            stem, ext = os.path.splitext(path)
+            path = f'{stem}-{shard}{ext}'
+        tasks.append(asyncio.create_task(dump_metrics(path=path, interval=settings.METRICS_INTERVAL)))
+
+    return tasks
+
+
+metrics = Metrics()
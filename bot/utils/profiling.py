@@ -0,0 +1,189 @@
+import asyncio
+import cProfile
+import functools
+import json
+import os
+import pstats
+import signal
+import tracemalloc
+from contextvars import ContextVar
+from datetime import datetime
+from time import perf_counter, time
+
+from bot.config import settings
+from bot.utils import logger
+from bot.utils.metrics import metrics
+
+SIGNALS = (('SIGUSR1', 'profile_cpu'), ('SIGUSR2', 'profile_allocations'))
+TRACEMALLOC_FRAMES = 5
+
+# Session and `Tapper` method the running code belongs to, set by `traced`
+current_call: ContextVar[tuple[str, str] | None] = ContextVar('current_call', default=None)
+
+
+def traced(method):
+    """Tags everything an async `Tapper` method runs with its session and name, for the slow callback reports."""
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        token = current_call.set((self.session_name, method.__name__))
+        try:
+            return await method(self, *args, **kwargs)
+        finally:
+            current_call.reset(token)
+
+    return wrapper
+
+
+def describe_callback(callback) -> str:
+    task = getattr(callback, '__self__', None)
+    if isinstance(task, asyncio.Task):
+        return f'{task.get_name()} ({task.get_coro().__qualname__})'
+    return getattr(callback, '__qualname__', repr(callback))
+
+
+class LoopMonitor:
+    """Event-loop health reports and on-demand profiles, written to PROFILE_DIR.
+
+    The lag sampler measures how late a LOOP_LAG_INTERVAL sleep wakes up. Callbacks that hold the loop for longer
+    than SLOW_CALLBACK_THRESHOLD are logged with the session and `Tapper` method they ran for, like lags above it,
+    as JSON lines in `slow.jsonl`. SIGUSR1 dumps a cProfile CPU profile of the next PROFILE_DURATION seconds,
+    SIGUSR2 the allocations made in them (tracemalloc), PROFILE_ON_START takes both right after the start.
+    Slow callbacks are only seen on the default asyncio loop, not on uvloop. Timing them replaces the private
+    `asyncio.events.Handle._run`, which is why SLOW_CALLBACK_THRESHOLD is off unless set.
+    """
+
+    def __init__(self):
+        self.shard: int | None = None
+        self._file = None
+        self._run = None
+        self._profiling: set[str] = set()
+        self._tasks: set[asyncio.Task] = set()
+
+    def path(self, name: str, ext: str) -> str:
+        suffix = f'-shard{self.shard}' if self.shard is not None else ''
+        return os.path.join(settings.PROFILE_DIR, f'{name}{suffix}{ext}')
+
+    def report(self, kind: str, seconds: float, call: tuple[str, str] | None = None, callback: str = '') -> None:
+        session, method = call or ('', '')
+        if self._file is None:
+            os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+            self._file = open(self.path(name='slow', ext='.jsonl'), 'a', encoding='utf-8', buffering=1)
+        self._file.write(json.dumps({'ts': time(), 'kind': kind, 'seconds': round(seconds, 6), 'session': session,
+                                     'method': method, 'callback': callback}) + '\n')
+        metrics.inc('slow_callbacks_total', kind=kind, method=method or '-')
+        logger.bind(sample=f'slow-{kind}').warning(
+            f"Event loop blocked for <y>{seconds * 1000:.0f}</y> ms"
+            + (f" | {session} | {method}" if call else "") + (f" | {callback}" if callback else ""))
+
+    def _install(self) -> None:
+        if self._run is not None or not isinstance(asyncio.get_running_loop(), asyncio.BaseEventLoop):
+            return
+
+        monitor = self
+        original = self._run = asyncio.events.Handle._run
+
+        def _run(handle: asyncio.Handle) -> None:
+            start = perf_counter()
+            original(handle)
+            elapsed = perf_counter() - start
+            if elapsed >= settings.SLOW_CALLBACK_THRESHOLD:
+                monitor.report(kind='callback', seconds=elapsed, call=handle._context.get(current_call),
+                               callback=describe_callback(handle._callback))
+
+        asyncio.events.Handle._run = _run
+
+    async def sample_lag(self) -> None:
+        while True:
+            start = perf_counter()
+            await asyncio.sleep(delay=settings.LOOP_LAG_INTERVAL)
+            lag = perf_counter() - start - settings.LOOP_LAG_INTERVAL
+            metrics.observe('event_loop_lag_seconds', lag)
+            if settings.SLOW_CALLBACK_THRESHOLD and lag >= settings.SLOW_CALLBACK_THRESHOLD:
+                self.report(kind='lag', seconds=lag)
+
+    async def profile_cpu(self, duration: float) -> None:
+        if 'cpu' in self._profiling:
+            return
+        self._profiling.add('cpu')
+        path = self.path(name=f'cpu-{datetime.now():%Y%m%d-%H%M%S}', ext='.prof')
+        logger.info(f"Profiling CPU for <y>{duration:.0f}</y> seconds")
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            await asyncio.sleep(delay=duration)
+        finally:
+            profile.disable()
+            self._profiling.discard('cpu')
+            os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+            profile.dump_stats(path)
+            with open(f'{path[:-len(".prof")]}.txt', 'w', encoding='utf-8') as file:
+                pstats.Stats(profile, stream=file).sort_stats('cumulative').print_stats(50)
+            logger.info(f"CPU profile saved to <c>{path}</c>")
+
+    async def profile_allocations(self, duration: float) -> None:
+        if 'allocations' in self._profiling or tracemalloc.is_tracing():
+            return
+        self._profiling.add('allocations')
+        path = self.path(name=f'alloc-{datetime.now():%Y%m%d-%H%M%S}', ext='.tracemalloc')
+        logger.info(f"Tracing allocations for <y>{duration:.0f}</y> seconds")
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        try:
+            await asyncio.sleep(delay=duration)
+            snapshot = tracemalloc.take_snapshot()
+        finally:
+            tracemalloc.stop()
+            self._profiling.discard('allocations')
+
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        snapshot.dump(path)
+        with open(f'{path[:-len(".tracemalloc")]}.txt', 'w', encoding='utf-8') as file:
+            for stat in snapshot.statistics('lineno')[:50]:
+                file.write(f'{stat}\n')
+        logger.info(f"Allocation profile saved to <c>{path}</c>")
+
+    def _on_signal(self, name: str) -> None:
+        task = asyncio.create_task(getattr(self, name)(duration=settings.PROFILE_DURATION))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def start(self, shard: int | None = None) -> list[asyncio.Task]:
+        """Installs the slow callback hook and signal handlers and starts the configured monitors."""
+        self.shard = shard
+        tasks = []
+        if settings.SLOW_CALLBACK_THRESHOLD:
+            self._install()
+        if settings.LOOP_LAG_INTERVAL:
+            tasks.append(asyncio.create_task(self.sample_lag()))
+        if settings.PROFILE_ON_START:
+            tasks.append(asyncio.create_task(self.profile_cpu(duration=settings.PROFILE_DURATION)))
+            tasks.append(asyncio.create_task(self.profile_allocations(duration=settings.PROFILE_DURATION)))
+
+        loop = asyncio.get_running_loop()
+        for signal_name, name in SIGNALS:
+            if hasattr(signal, signal_name):
+                try:
+                    loop.add_signal_handler(getattr(signal, signal_name), self._on_signal, name)
+                except (NotImplementedError, RuntimeError):
+                    # Windows, or a loop that is not running in the main thread
+                    pass
+        return tasks
+
+    def stop(self) -> None:
+        loop = asyncio.get_running_loop()
+        for signal_name, _ in SIGNALS:
+            if hasattr(signal, signal_name):
+                try:
+                    loop.remove_signal_handler(getattr(signal, signal_name))
+                except (NotImplementedError, RuntimeError):
+                    pass
+        for task in self._tasks:
+            task.cancel()
+        if self._run is not None:
+            asyncio.events.Handle._run = self._run
+            self._run = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+loop_monitor = LoopMonitor()
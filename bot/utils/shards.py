@@ -0,0 +1,129 @@
+import asyncio
+import multiprocessing
+import os
+import queue
+from time import time
+
+from bot.config import settings
+from bot.core.connectors import connector_pool
+from bot.core.scheduler import Scheduler
+from bot.core.state import state_store
+from bot.utils import logger
+from bot.utils.logger import setup_logging
+from bot.utils import launcher
+
+
+STATUS_INTERVAL = 60
+
+
+def split_accounts(session_names: list[str], proxies: list[str | None], workers: int) -> list[list[tuple[str, str | None]]]:
+    accounts = list(zip(session_names, proxies))
+    return [accounts[index::workers] for index in range(workers) if accounts[index::workers]]
+
+
+async def run_shards(workers: int) -> None:
+    """Supervises worker processes that each run the scheduler over a slice of the sessions."""
+    session_names = launcher.get_session_names()
+    launcher.check_sessions(session_names=session_names)
+
+    proxies = await launcher.assign_proxies(session_names=session_names)
+    await connector_pool.close()
+    await state_store.close()
+    shards = split_accounts(session_names=session_names, proxies=proxies, workers=workers)
+
+    context = multiprocessing.get_context('spawn')
+    status_queue = context.Queue()
+    processes: dict[int, multiprocessing.Process] = {}
+    restarts = {index: 0 for index in range(len(shards))}
+    restart_at: dict[int, float] = {}
+    statuses: dict[int, dict] = {}
+
+    def start(index: int) -> None:
+        process = context.Process(target=run_shard, args=(index, shards[index], len(shards), status_queue),
+                                  name=f'shard-{index}', daemon=True)
+        process.start()
+        processes[index] = process
+        logger.info(f"Shard {index} | Started with {len(shards[index])} sessions | PID: {process.pid}")
+
+    for index in range(len(shards)):
+        start(index)
+
+    last_report = time()
+    try:
+        while processes or restart_at:
+            await asyncio.sleep(delay=1)
+
+            while True:
+                try:
+                    status = status_queue.get_nowait()
+                except queue.Empty:
+                    break
+                statuses[status['shard']] = status
+
+            for index, process in list(processes.items()):
+                if process.is_alive():
+                    continue
+
+                del processes[index]
+                statuses.pop(index, None)
+                if process.exitcode == 0:
+                    logger.info(f"Shard {index} | Finished")
+                    continue
+
+                restarts[index] += 1
+                delay = min(300, 5 * 2 ** min(restarts[index], 6))
+                logger.error(f"Shard {index} | Crashed with exit code {process.exitcode} | Restart in {delay}s")
+                restart_at[index] = time() + delay
+
+            for index, at in list(restart_at.items()):
+                if at <= time():
+                    del restart_at[index]
+                    start(index)
+
+            if time() - last_report >= STATUS_INTERVAL:
+                last_report = time()
+                accounts = sum(status['accounts'] for status in statuses.values())
+                ticks = sum(status['ticks'] for status in statuses.values())
+                errors = sum(status['errors'] for status in statuses.values())
+                logger.info(f"Shards: <m>{len(processes)}/{len(shards)}</m> alive | Accounts: <m>{accounts}</m> | "
+                            f"Rounds: <m>{ticks}</m> | Errors: <m>{errors}</m> | "
+                            f"Restarts: <m>{sum(restarts.values())}</m>")
+    finally:
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            process.join(timeout=10)
+
+
+def run_shard(index: int, accounts: list[tuple[str, str | None]], shards: int, status_queue) -> None:
+    setup_logging(shard=index)
+    if settings.USE_UVLOOP:
+        try:
+            import uvloop
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        except ImportError:
+            logger.warning(f"Shard {index} | uvloop is not installed, using the default event loop")
+
+    try:
+        asyncio.run(_run_shard(index=index, accounts=accounts, shards=shards, status_queue=status_queue))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _run_shard(index: int, accounts: list[tuple[str, str | None]], shards: int, status_queue) -> None:
+    session_names = [session_name for session_name, _ in accounts]
+    proxies = [proxy for _, proxy in accounts]
+    scheduler = Scheduler(concurrency=settings.MAX_CONCURRENCY)
+
+    async def report() -> None:
+        while True:
+            status_queue.put({'shard': index, 'pid': os.getpid(), 'accounts': scheduler.accounts,
+                              'ticks': scheduler.ticks, 'errors': scheduler.errors})
+            await asyncio.sleep(delay=STATUS_INTERVAL / 2)
+
+    reporter = asyncio.create_task(report())
+    try:
+        await launcher.run_tasks(session_names=session_names, proxies=proxies, scheduler=scheduler,
+                                 start_rate=settings.START_RATE / shards, shard=index)
+    finally:
+        reporter.cancel()